@@ -3,6 +3,12 @@ import sys
 from collections import namedtuple
 from dataclasses import dataclass
 from os import path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+import tcod.console
+
+import mrogue.session
 
 __author__ = "Kamil Nienałtowski"
 __copyright__ = "Copyright (C) 2018-2021 Kamil Nienałtowski"
@@ -17,6 +23,15 @@ else:
 Point = namedtuple("Point", ("x", "y"))
 
 
+def forked(original: Any, memo: dict[int, Any]) -> Any:
+    # the counterpart of an object in the game state being forked; objects without
+    # a fork method don't change during a game and are shared with the fork
+    if id(original) in memo:
+        return memo[id(original)]
+    fork = getattr(original, "fork", None)
+    return original if fork is None else fork(memo)
+
+
 @dataclass
 class Glyph:
     icon: int = 0
@@ -25,6 +40,22 @@ class Glyph:
     background: tuple[int, ...] = (0, 0, 0)
     bg_alpha: int = 255
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        # any change to the appearance makes the packed graphic stale
+        if name in Glyph.__dataclass_fields__:
+            self.__dict__.pop("_graphic", None)
+
+    @property
+    def graphic(self) -> np.void:
+        # the tile packed as a single tcod.console.rgba_graphic value, ready for blitting
+        try:
+            return self.__dict__["_graphic"]
+        except KeyError:
+            graphic = np.array([self.tile], dtype=tcod.console.rgba_graphic)[0]
+            self.__dict__["_graphic"] = graphic
+            return graphic
+
     @property
     def tile(self) -> tuple[int, tuple[int, ...], tuple[int, ...]]:
         return (
@@ -46,25 +77,163 @@ class Glyph:
 
 
 class Entity(Glyph):
+    # name of the EntityRegistry view this kind of Entity is listed in
+    layer = "features"
+    # Entities are distinct objects even if they look the same, as opposed to Glyphs
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
     def __init__(self) -> None:
         super().__init__()
-        self._groups: list[list[Entity]] = []
+        self._groups: dict[Group | EntityRegistry, None] = {}
+        # identifies the Entity in the state hash, the same in every run of a game
+        self.serial = mrogue.session.current().new_serial()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        code = mrogue.session.hash_codes.get(name)
+        if code is not None:
+            session = mrogue.session.current()
+            if name in self.__dict__:
+                session.toggle(self.serial, code, self.__dict__[name])
+            session.toggle(self.serial, code, value)
+        super().__setattr__(name, value)
 
-    def add(self, *groups: list["Entity"]) -> None:
+    def __copy__(self) -> "Entity":
+        # a copy starts outside of any group, it has to be added explicitly
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone._groups = {}
+        # a new Entity as far as the state hash goes
+        session = mrogue.session.current()
+        clone.serial = session.new_serial()
+        for name, code in mrogue.session.hash_codes.items():
+            if name in clone.__dict__:
+                session.toggle(clone.serial, code, clone.__dict__[name])
+        return clone
+
+    def __getstate__(self) -> dict[str, Any]:
+        # for saving, caches are left out
+        state = dict(self.__dict__)
+        state.pop("_graphic", None)
+        return state
+
+    def fork(self, memo: dict[int, Any]) -> "Entity":
+        # like a copy, the groups holding the fork link it back as they are forked;
+        # object.__new__, as Player.__new__ would return the player of the active game
+        clone = memo[id(self)] = object.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone._groups = {}
+        return clone
+
+    def add(self, *groups: "Group | EntityRegistry | None") -> None:
         for group in groups:
             if group is not None:
-                group.append(self)
+                group.add(self)
                 if group not in self._groups:
-                    self._groups.append(group)
+                    self._groups[group] = None
+                    self._moved(group)
 
-    def remove(self, *groups: list["Entity"]) -> None:
+    def remove(self, *groups: "Group | EntityRegistry") -> None:
         for group in groups:
-            if self in group:
-                group.remove(self)
+            group.discard(self)
             if group in self._groups:
-                self._groups.remove(group)
+                del self._groups[group]
+                self._moved(group)
 
     def kill(self) -> None:
         for group in self._groups:
-            group.remove(self)
-            self._groups.remove(group)
+            group.discard(self)
+            self._moved(group)
+        self._groups.clear()
+
+    def _moved(self, group: "Group | EntityRegistry") -> None:
+        # where an Entity is (which Level, whose inventory) counts in the state hash
+        mrogue.session.current().toggle(
+            self.serial, mrogue.session.hash_codes["groups"], group.serial
+        )
+
+    def changed(self) -> None:
+        # let the groups that index this Entity by its attributes update themselves
+        for group in self._groups:
+            group.refresh(self)
+
+
+class Group:
+    # insertion-ordered set of Entities with O(1) add, discard and membership test
+    # groups that Entities join themselves have serials of their own, see Entity.add
+    serial = 0
+
+    def __init__(self, entities: Iterable[Entity] = ()) -> None:
+        self._members: dict[Entity, Any] = dict.fromkeys(entities)
+
+    def __contains__(self, entity: object) -> bool:
+        return entity in self._members
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._members)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __repr__(self) -> str:
+        return f"Group({list(self._members)})"
+
+    def fork(self, memo: dict[int, Any]) -> "Group":
+        clone = memo[id(self)] = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone._members = {}
+        for entity, value in self._members.items():
+            entity = forked(entity, memo)
+            clone._members[entity] = value
+            entity._groups[clone] = None
+        return clone
+
+    def add(self, entity: Entity) -> None:
+        self._members[entity] = None
+
+    def discard(self, entity: Entity) -> None:
+        self._members.pop(entity, None)
+
+    def refresh(self, entity: Entity) -> None:
+        pass
+
+
+class EntityRegistry:
+    # all Entities present on a Level, with typed views kept up to date on every change
+    def __init__(self, serial: int | None = None) -> None:
+        if serial is None:
+            serial = mrogue.session.current().new_serial()
+        self.serial = serial
+        self.all = Group()
+        self.units = Group()
+        self.items = Group()
+        self.features = Group()
+
+    def __contains__(self, entity: object) -> bool:
+        return entity in self.all
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.all)
+
+    def __len__(self) -> int:
+        return len(self.all)
+
+    def fork(self, memo: dict[int, Any]) -> "EntityRegistry":
+        # the Entities are linked directly, joining would count in this game's state hash
+        clone = memo[id(self)] = EntityRegistry(self.serial)
+        for entity in self.all:
+            entity = forked(entity, memo)
+            clone.add(entity)
+            entity._groups[clone] = None
+        return clone
+
+    def add(self, entity: Entity) -> None:
+        self.all.add(entity)
+        getattr(self, entity.layer).add(entity)
+
+    def discard(self, entity: Entity) -> None:
+        self.all.discard(entity)
+        getattr(self, entity.layer).discard(entity)
+
+    def refresh(self, entity: Entity) -> None:
+        pass
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import random
+from copy import copy
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+import tcod.console
+
+import mrogue.item.manager
+import mrogue.keymap
+import mrogue.map
+import mrogue.terminal
+from mrogue import Point
+
+# the directions (including "wait") first, in keymap.compass order
+actions = (*mrogue.keymap.compass, "pickup", "descend", "ascend")
+
+tile_kinds = ("wall", "floor", "stairs_down", "stairs_up")
+# tile kinds told apart by the character they are drawn with
+tile_codes = np.array([mrogue.map.tiles[kind].lit[0] for kind in tile_kinds])
+tile_order = tile_codes.argsort()
+
+# what the values of the "stats" observation are, in order
+stats = (
+    "HP",
+    "max_HP",
+    "armor_class",
+    "damage_min",
+    "damage_max",
+    "to_hit",
+    "speed",
+    "depth",
+    "x",
+    "y",
+    "turn",
+)
+
+
+class Headless(mrogue.terminal.Terminal):
+    # a game driven by code: nothing is drawn and there are no keys to wait for
+    def present(self, console: tcod.console.Console) -> None:
+        pass
+
+    def write(self, data: str) -> None:
+        pass
+
+    def read(self, block: bool) -> list[tuple[int, int]]:
+        if block:
+            raise RuntimeError("A headless game can't wait for key presses.")
+        return []
+
+
+def observe(games: Sequence[Any]) -> dict[str, np.ndarray]:
+    # observations of all the games at once, stacked along the first axis
+    sessions = [game.session for game in games]
+    levels = [session.current_level for session in sessions]
+    shape = (len(games), *levels[0].mapDim)
+    codes = np.stack([level.tiles["lit"]["ch"] for level in levels])
+    monsters = np.zeros(shape, np.uint8)
+    np.add.at(
+        monsters,
+        positions(
+            (index, unit)
+            for index, level in enumerate(levels)
+            for unit in level.entities.units
+            if not unit.player
+        ),
+        1,
+    )
+    items = np.zeros(shape, np.uint8)
+    np.add.at(
+        items,
+        positions(
+            (index, item)
+            for index, level in enumerate(levels)
+            for item in level.entities.items
+        ),
+        1,
+    )
+    return {
+        "tiles": tile_order[
+            np.searchsorted(tile_codes, codes, sorter=tile_order)
+        ].astype(np.uint8),
+        "explored": np.stack([level.explored for level in levels]),
+        "fov": np.stack([session.player.fov for session in sessions]),
+        "monsters": monsters,
+        "items": items,
+        "stats": np.array(
+            [
+                (
+                    session.player.current_HP,
+                    session.player.max_HP,
+                    session.player.armor_class,
+                    *session.player.damage_dice,
+                    session.player.to_hit,
+                    session.player.speed,
+                    session.depth,
+                    *session.player.pos,
+                    game.turn,
+                )
+                for game, session in zip(games, sessions)
+            ],
+            np.float32,
+        ).reshape(len(games), len(stats)),
+    }
+
+
+def positions(
+    entities: Iterable[tuple[int, Any]]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (game, x, y) index arrays of Entities, for scattering them into stacked layers
+    found = np.array([(index, *entity.pos) for index, entity in entities], np.intp)
+    found = found.reshape(-1, 3)
+    return found[:, 0], found[:, 1], found[:, 2]
+
+
+class Environment:
+    # reset(seed) / step(action) access to a game, with observations as NumPy arrays
+    def __init__(self, new_game: Callable[[mrogue.terminal.Terminal], Any]) -> None:
+        self.new_game = new_game
+        self.game: Any = None
+        self.deepest = 0
+
+    def reset(
+        self, seed: int | None = None
+    ) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+        self.start(seed)
+        return self.observe(), self.info()
+
+    def step(
+        self, action: int
+    ) -> tuple[dict[str, np.ndarray], float, bool, bool, dict[str, Any]]:
+        reward, terminated = self.play(action)
+        return self.observe(), reward, terminated, False, self.info()
+
+    def fork(self) -> Environment:
+        # an Environment starting from the current state of this one, stepped separately
+        clone = copy(self)
+        clone.game = self.game.fork()
+        return clone
+
+    def start(self, seed: int | None) -> None:
+        random.seed(seed)
+        self.game = self.new_game(Headless())
+        self.game.advance()
+        self.deepest = 0
+
+    def play(self, action: int) -> tuple[float, bool]:
+        game = self.game
+        game.session.activate()
+        game.messenger.clear()
+        level = game.dungeon.current_level
+        monsters = [unit for unit in level.entities.units if not unit.player]
+        if self.act(actions[action]):
+            game.advance()
+        # one point for every monster killed and for every new depth reached; a Level
+        # left may be paged out already, taking the stairs kills nobody
+        reward = 0.0
+        if not level.paged:
+            reward = float(sum(monster not in level.entities for monster in monsters))
+        if game.session.depth > self.deepest:
+            self.deepest = game.session.depth
+            reward += 1.0
+        return reward, game.player.current_HP < 1
+
+    def act(self, name: str) -> bool:
+        # returns True if the action took a turn
+        game = self.game
+        player = game.player
+        if name == "pickup":
+            items = mrogue.item.manager.ItemManager.get_item_on_map(player.pos)
+            return player.pickup_items(items or [])
+        elif name == "descend":
+            return game.dungeon.descend(player.pos, game.num_objects)
+        elif name == "ascend":
+            return game.dungeon.ascend(player.pos)
+        delta = mrogue.keymap.compass[name]
+        return bool(
+            game.dungeon.movement(
+                player, Point(player.pos.x + delta.x, player.pos.y + delta.y)
+            )
+        )
+
+    def observe(self) -> dict[str, np.ndarray]:
+        return {name: layer[0] for name, layer in observe([self.game]).items()}
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "messages": list(self.game.session.messages),
+            "state_hash": self.game.session.state_hash(),
+        }
+
+
+class VectorEnvironment:
+    # several games in one process, each stepped in turn with its own action; only the
+    # observations are built for all of them at once, stacked along the first axis with
+    # the rewards. Field of view and monster moves stay part of every game's own turn.
+    # Finished games start over right away
+    def __init__(
+        self, new_game: Callable[[mrogue.terminal.Terminal], Any], count: int
+    ) -> None:
+        self.environments = [Environment(new_game) for _ in range(count)]
+        self.seed: int | None = None
+        self.episodes = [0] * count
+
+    def __len__(self) -> int:
+        return len(self.environments)
+
+    def reset(
+        self, seed: int | None = None
+    ) -> tuple[dict[str, np.ndarray], list[dict[str, Any]]]:
+        self.seed = seed
+        self.episodes = [0] * len(self)
+        for index, environment in enumerate(self.environments):
+            environment.start(self.seed_for(index))
+        return self.observe(), self.info()
+
+    def step(
+        self, actions: Sequence[int] | np.ndarray
+    ) -> tuple[
+        dict[str, np.ndarray], np.ndarray, np.ndarray, np.ndarray, list[dict[str, Any]]
+    ]:
+        rewards = np.zeros(len(self), np.float32)
+        terminated = np.zeros(len(self), bool)
+        for index, (environment, action) in enumerate(zip(self.environments, actions)):
+            rewards[index], terminated[index] = environment.play(int(action))
+        info = self.info()
+        for finished in map(int, np.flatnonzero(terminated)):
+            self.episodes[finished] += 1
+            self.environments[finished].start(self.seed_for(finished))
+        return self.observe(), rewards, terminated, np.zeros(len(self), bool), info
+
+    def seed_for(self, index: int) -> int | None:
+        # every game of every episode gets a seed of its own
+        if self.seed is None:
+            return None
+        return self.seed + index + len(self) * self.episodes[index]
+
+    def observe(self) -> dict[str, np.ndarray]:
+        return observe([environment.game for environment in self.environments])
+
+    def info(self) -> list[dict[str, Any]]:
+        return [environment.info() for environment in self.environments]
@@ -1,30 +1,39 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import hashlib
+import inspect
+import os
+import queue
 import string
+import threading
 from os import path
-from typing import Any, Callable, NamedTuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Coroutine,
+    Generic,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Sequence,
+    TypeVar,
+    cast,
+)
 
 import numpy as np
 import tcod.event
 
 import mrogue
+import mrogue.keymap
+import mrogue.session
+from mrogue.session import SessionAttribute
 
-directions = np.asarray(
-    [
-        [
-            [0, tcod.event.K_UP, 0],
-            [tcod.event.K_LEFT, 0, tcod.event.K_RIGHT],
-            [0, tcod.event.K_DOWN, 0],
-        ],
-        [
-            [tcod.event.K_KP_7, tcod.event.K_KP_8, tcod.event.K_KP_9],
-            [tcod.event.K_KP_4, tcod.event.K_KP_5, tcod.event.K_KP_6],
-            [tcod.event.K_KP_1, tcod.event.K_KP_2, tcod.event.K_KP_3],
-        ],
-        [[55, 56, 57], [52, 53, 54], [49, 50, 51]],
-    ]
-)
+if TYPE_CHECKING:
+    import mrogue.terminal
+
+T = TypeVar("T")
 
 ignore_keys = (
     tcod.event.K_LALT,
@@ -38,11 +47,6 @@ ignore_keys = (
 ignore_mods = tcod.event.KMOD_NUM
 
 
-def direction_from(key: int, pos: mrogue.Point) -> mrogue.Point:
-    placement = np.nonzero(directions == key)
-    return mrogue.Point(pos.x + placement[2][0] - 1, pos.y + placement[1][0] - 1)
-
-
 def key_is(
     key: tuple[int, int], target_key: int, target_mod: int = tcod.event.KMOD_NONE
 ) -> bool:
@@ -71,21 +75,70 @@ def mod_is(mod: int, target_mod: int = tcod.event.KMOD_NONE) -> bool:
     return False
 
 
-def wait(character: int = None, mod: int = tcod.event.KMOD_NONE) -> tuple[int, int]:
+def keys_from(events: Iterable[tcod.event.Event]) -> Iterator[tuple[int, int]]:
+    for event in events:
+        if isinstance(event, tcod.event.Quit):
+            raise SystemExit
+        # don't consider modifiers to be key presses
+        elif isinstance(event, tcod.event.KeyDown) and event.sym not in ignore_keys:
+            yield event.sym, event.mod
+
+
+def pressed() -> Iterable[tuple[int, int]]:
+    # frames the render thread finished are shown first
+    Screen.sync(False)
+    if Screen._terminal is not None:
+        return Screen._terminal.read(False)
+    return keys_from(tcod.event.get())
+
+
+async def keys() -> list[tuple[int, int]]:
+    # waits for at least one key, with every frame handed to the render thread shown
+    Screen.sync()
+    if Screen._terminal is not None:
+        return await Screen._terminal.keys()
+    return list(keys_from(tcod.event.wait()))
+
+
+def run(game: Coroutine[Any, Any, T]) -> T:
+    # plays a game whose keys come from a window or a terminal of its own: waiting for
+    # them blocks, so the coroutine finishes without ever being suspended; games hosted
+    # by the server are awaited in its event loop instead
+    try:
+        game.send(None)
+    except StopIteration as finished:
+        return cast(T, finished.value)
+    game.close()
+    raise RuntimeError("The game waited for an event loop.")
+
+
+def peek() -> tuple[int, int] | None:
+    # collect keys pressed in the meantime without blocking
+    typeahead = mrogue.session.current().typeahead
+    typeahead.extend(pressed())
+    return typeahead[0] if typeahead else None
+
+
+def flush() -> None:
+    # drop typeahead, including key repeats still waiting in the event queue
+    peek()
+    mrogue.session.current().typeahead.clear()
+
+
+async def wait(
+    character: int | None = None, mod: int = tcod.event.KMOD_NONE
+) -> tuple[int, int]:
+    typeahead = mrogue.session.current().typeahead
     while True:
-        for event in tcod.event.wait():
-            if event.type == "QUIT":
-                raise SystemExit
-            # don't consider modifiers to be key presses
-            elif event.type == "KEYDOWN" and event.sym not in ignore_keys:
-                if character:
-                    if key_is((event.sym, event.mod), character, mod):
-                        return event.sym, event.mod
-                else:
-                    return event.sym, event.mod
-
-
-def help_screen() -> None:
+        if not typeahead:
+            typeahead.extend(await keys())
+        while typeahead:
+            key = typeahead.popleft()
+            if not character or key_is(key, character, mod):
+                return key
+
+
+async def help_screen() -> None:
     help_contents = [
         "Kill all monsters. To attack, 'walk' into them.",
         "Move with keyboard arrows, numpad or number keys.",
@@ -103,13 +156,14 @@ def help_screen() -> None:
         "M  - show message history.",
         "H  - show this help screen.",
         "Q  - close game when on main screen",
+        "S  - save the game, start with 'load' to continue it",
         "^R - cycle tileset (font)",
         "",
         "Esc - close pop-up windows like this one.",
     ]
     width = 2 + max([len(line) for line in help_contents])
     height = 2 + len(help_contents)
-    window = tcod.Console(width, height, "F")
+    window = mrogue.io.window("help", width, height)
     window.draw_frame(
         0, 0, width, height, f"Welcome to MRogue {mrogue.__version__}!", False
     )
@@ -117,26 +171,127 @@ def help_screen() -> None:
         window.print(1, i + 1, help_contents[i])
     window.blit(Screen.get(), 12, 12, bg_alpha=0.95)
     Screen.get().present()
-    wait(tcod.event.K_ESCAPE)
+    await wait(tcod.event.K_ESCAPE)
 
 
-def select_action(
-    options: list[tuple[str, Any, Callable[[None], None]]]
+async def select_action(
+    options: list[tuple[str, Any, Callable[[Any], Any]]]
 ) -> tuple[bool, bool | None]:
     w, h = 23, len(options) + 2
-    dialog = tcod.console.Console(w, h, "F")
+    dialog = mrogue.io.window("actions", w, h)
     dialog.draw_frame(0, 0, w, h, "Select an action:")
     for row, option in enumerate(options):
         dialog.print(2, row + 1, f"{string.ascii_letters[row]}) {option[0]}")
         dialog.blit(Screen.get(), 4 + 10, 4 + 1)
         Screen.get().present()
     while True:
-        selection = mrogue.io.wait()
+        selection = await mrogue.io.wait()
         if mrogue.io.key_is(selection, tcod.event.K_ESCAPE):
             return False, None
         elif selection[0] in range(97, 97 + len(options)):
             selected = selection[0] - 97
-            return True, options[selected][2](options[selected][1])
+            return True, await mrogue.io.result_of(
+                options[selected][2](options[selected][1])
+            )
+
+
+async def result_of(action: Any) -> Any:
+    # the result of an action, which may have to wait for keys first
+    return await action if inspect.isawaitable(action) else action
+
+
+def window(name: str, width: int, height: int) -> tcod.console.Console:
+    # pop-up windows are kept by name, and reused while their size stays the same
+    window_pool = mrogue.session.current().window_pool
+    console = window_pool.get(name)
+    if console is None or (console.width, console.height) != (width, height):
+        console = window_pool[name] = tcod.console.Console(width, height, "F")
+    console.clear()
+    return console
+
+
+class ListView(Generic[T]):
+    # scrolling list drawing only the rows that fit, with optional a-zA-Z hotkeys
+    # and search (Ctrl+F) to reach rows past the 52 letters
+    def __init__(
+        self,
+        rows: Sequence[T],
+        height: int,
+        label: Callable[[T], str] = str,
+        hotkeys: bool = True,
+    ):
+        self.height = height
+        self.label = label
+        self.hotkeys = hotkeys
+        self.scroll = 0
+        self.query = ""
+        self.searching = False
+        self.update(rows)
+
+    def __len__(self) -> int:
+        return len(self.shown)
+
+    def update(self, rows: Sequence[T]) -> None:
+        self.rows = rows
+        query = self.query.lower()
+        self.shown = [row for row in rows if query in self.label(row).lower()]
+        self.scroll = max(0, min(self.scroll, len(self.shown) - self.height))
+
+    def handle(self, key: tuple[int, int]) -> bool:
+        # returns True if the key was used for scrolling or searching
+        sym, mod = mrogue.keymap.normalized(key)
+        if sym == tcod.event.K_UP and not mod:
+            self.scroll = max(0, self.scroll - 1)
+        elif sym == tcod.event.K_DOWN and not mod:
+            self.scroll = max(0, min(self.scroll + 1, len(self.shown) - self.height))
+        elif sym == tcod.event.K_f and mod == tcod.event.KMOD_CTRL:
+            self.searching = True
+        elif not self.searching:
+            return False
+        elif sym == tcod.event.K_ESCAPE:
+            self.searching = False
+            self.query = ""
+        elif sym == tcod.event.K_RETURN:
+            self.searching = False
+        elif sym == tcod.event.K_BACKSPACE:
+            self.query = self.query[:-1]
+        elif 32 <= sym < 127 and mod in (0, tcod.event.KMOD_SHIFT):
+            self.query += chr(sym)
+        self.update(self.rows)
+        return True
+
+    def selected(self, key: tuple[int, int]) -> T | None:
+        if not self.hotkeys or self.searching:
+            return None
+        sym, mod = mrogue.keymap.normalized(key)
+        if ord("a") <= sym <= ord("z") and mod in (0, tcod.event.KMOD_SHIFT):
+            index = sym - ord("a") + (26 if mod else 0)
+            if index < len(self.shown):
+                return self.shown[index]
+        return None
+
+    def draw(
+        self,
+        console: tcod.console.Console,
+        x: int,
+        y: int,
+        draw_row: Callable[[tcod.console.Console, int, int, T], None],
+    ) -> None:
+        for line, row in enumerate(self.shown[self.scroll : self.scroll + self.height]):
+            index = self.scroll + line
+            if self.hotkeys and index < len(string.ascii_letters):
+                console.print(x + 1, y + line, f"{string.ascii_letters[index]}) ")
+            draw_row(console, x + (4 if self.hotkeys else 1), y + line, row)
+        if self.scroll > 0:
+            console.print(x, y, chr(0x2191), Color.black, Color.white)
+        if self.scroll + self.height < len(self.shown):
+            console.print(x, y + self.height - 1, chr(0x2193), Color.black, Color.white)
+        # the search prompt goes over the window's bottom border
+        if self.searching or self.query:
+            cursor = "_" if self.searching else ""
+            console.print(
+                x + 1, console.height - 1, f" Find: {self.query}{cursor} ", Color.yellow
+            )
 
 
 tile_dt = np.dtype(
@@ -168,42 +323,182 @@ class Color:
     lighter_gray = (191, 191, 191)
 
 
+class Tilesets:
+    # tilesheets from the data directory, decoded on first use and then kept in memory;
+    # if cache_dir is given, decoded tiles are also stored there to skip PNG decoding
+    def __init__(self, cache_dir: str | None = None) -> None:
+        self.cache_dir = cache_dir
+        self._loaded: dict[str, tcod.tileset.Tileset] = {}
+
+    def get(self, filename: str) -> tcod.tileset.Tileset:
+        if filename not in self._loaded:
+            self._loaded[filename] = self._load(
+                path.join(mrogue.work_dir, "data", filename)
+            )
+        return self._loaded[filename]
+
+    @staticmethod
+    def _decode(file_path: str) -> tcod.tileset.Tileset:
+        return tcod.tileset.load_tilesheet(
+            file_path, 16, 16, tcod.tileset.CHARMAP_CP437
+        )
+
+    def _load(self, file_path: str) -> tcod.tileset.Tileset:
+        if not self.cache_dir:
+            return self._decode(file_path)
+        with open(file_path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        cached = path.join(self.cache_dir, f"{digest}.npy")
+        try:
+            tiles = np.load(cached)
+        except (OSError, ValueError):
+            tileset = self._decode(file_path)
+            tiles = np.stack([tileset.get_tile(c) for c in tcod.tileset.CHARMAP_CP437])
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                np.save(cached, tiles)
+            except OSError:
+                pass
+            return tileset
+        tileset = tcod.tileset.Tileset(tiles.shape[2], tiles.shape[1])
+        for codepoint, tile in zip(tcod.tileset.CHARMAP_CP437, tiles):
+            tileset.set_tile(codepoint, tile)
+        return tileset
+
+
+def opaque(console: tcod.console.Console) -> tcod.console.Console:
+    # Tileset.render fails on transparent cells, the window shows them blended over black
+    bg = console.rgba["bg"].astype(np.int32)
+    fg = console.rgba["fg"].astype(np.int32)
+    bg[..., :3] = bg[..., :3] * bg[..., 3:] // 255
+    fg[..., :3] = bg[..., :3] + (fg[..., :3] - bg[..., :3]) * fg[..., 3:] // 255
+    bg[..., 3] = fg[..., 3] = 255
+    console.rgba["bg"], console.rgba["fg"] = bg, fg
+    return console
+
+
 class Screen(tcod.Console):
-    _instance = None
-    _context = None
+    _instance = SessionAttribute("screen")
+    _context: tcod.context.Context | None = None
+    # set when drawing to a plain or remote terminal instead of an SDL window
+    _terminal = SessionAttribute("terminal")
+    # parts of the main view that have to be redrawn before the next frame is presented
+    layers = ("map", "status", "messages")
+    dirty = SessionAttribute("dirty")
 
-    def __new__(cls, *args, **kwargs) -> "Screen":
-        if not cls._instance:
-            cls._instance = super(Screen, cls).__new__(cls)
-        return cls._instance
+    def __new__(cls, *args: Any, **kwargs: Any) -> "Screen":
+        session = mrogue.session.current()
+        if not session.screen:
+            session.screen = super(Screen, cls).__new__(cls)
+        return session.screen
 
-    def __init__(self, width: int, height: int, font: tcod.tileset.Tileset):
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        font: tcod.tileset.Tileset | None,
+        threaded: bool = False,
+        terminal: mrogue.terminal.Terminal | None = None,
+    ):
         super().__init__(width, height, "F")
-        Screen._context = tcod.context.new(
-            columns=width,
-            rows=height,
-            tileset=font,
-            renderer=tcod.RENDERER_SDL2,
-            title=f"MRogue {mrogue.__version__}",
-        )
+        Screen.invalidate()
+        if terminal is not None:
+            mrogue.session.current().terminal = terminal
+        else:
+            Screen._context = tcod.context.new(
+                columns=width,
+                rows=height,
+                tileset=font,
+                renderer=tcod.RENDERER_SDL2,
+                title=f"MRogue {mrogue.__version__}",
+            )
         Screen.cols, Screen.rows = width, height
+        # in threaded mode finished frames are copied to one of two back buffers, which a
+        # render thread turns into pixels (or ANSI sequences) while the game goes on;
+        # SDL only works from the main thread, which uploads and presents them
+        self.frames: queue.Queue[tcod.console.Console] | None = None
+        if threaded:
+            self.frames = queue.Queue(maxsize=1)
+            self.free_buffers: queue.Queue[tcod.console.Console] = queue.Queue()
+            for _ in range(2):
+                self.free_buffers.put(tcod.console.Console(width, height, "F"))
+            self.rendered: queue.Queue[np.ndarray | str] = queue.Queue()
+            self.font = font
+            threading.Thread(target=self._render, args=(terminal,), daemon=True).start()
 
     @classmethod
     def get(cls) -> "Screen" | tcod.Console:
         return cls._instance
 
     @classmethod
-    def present(cls, *args, **kwargs) -> None:
-        cls._context.present(Screen._instance, *args, **kwargs)
+    def present(cls) -> None:
+        screen = cls._instance
+        if screen.frames is None:
+            if cls._terminal is not None:
+                cls._terminal.present(screen)
+            else:
+                assert cls._context is not None
+                cls._context.present(screen)
+        else:
+            cls.sync(block=False)
+            # blocks only when the render thread is a whole frame behind
+            buffer = screen.free_buffers.get()
+            buffer.rgba[...] = screen.rgba
+            screen.frames.put(buffer)
+        # anything presented outside the main view (menus, prompts) covers all the layers
+        cls.invalidate()
 
     @classmethod
-    def change_font(cls, font: tuple[str, tuple[int, int]]) -> None:
-        new_font = tcod.tileset.load_tilesheet(
-            path.join(mrogue.work_dir, "data", font[0]),
-            16,
-            16,
-            tcod.tileset.CHARMAP_CP437,
-        )
-        cls._context.change_tileset(new_font)
-        cls._context.sdl_window.size = cls.cols * font[1][0], cls.rows * font[1][1]
+    def invalidate(cls, *layers: str) -> None:
+        cls.dirty.update(layers or cls.layers)
+
+    def _render(self, terminal: mrogue.terminal.Terminal | None) -> None:
+        assert self.frames is not None
+        while True:
+            buffer = self.frames.get()
+            if terminal is not None:
+                self.rendered.put(terminal.diff(buffer))
+            else:
+                # the font is read once, change_font may replace it meanwhile
+                font = self.font
+                assert font is not None
+                self.rendered.put(font.render(opaque(buffer)))
+            self.free_buffers.put(buffer)
+            self.frames.task_done()
+
+    @classmethod
+    def sync(cls, block: bool = True) -> None:
+        # put the frames rendered so far on the screen, with block all of those handed
+        # to the render thread
+        screen = cls._instance
+        if screen is None or screen.frames is None:
+            return
+        if block:
+            screen.frames.join()
+        # only the main thread takes them
+        while not screen.rendered.empty():
+            rendered = screen.rendered.get()
+            if isinstance(rendered, str):
+                cls._terminal.write(rendered)
+                continue
+            assert cls._context is not None and cls._context.sdl_renderer is not None
+            renderer = cls._context.sdl_renderer
+            renderer.clear()
+            renderer.copy(renderer.upload_texture(rendered))
+            renderer.present()
+
+    @classmethod
+    def change_font(
+        cls, font: tuple[str, tuple[int, int]], tileset: tcod.tileset.Tileset
+    ) -> None:
+        if cls._terminal is not None:
+            # the terminal's own font is used
+            return
+        context = cls._context
+        assert context is not None and context.sdl_window is not None
+        context.change_tileset(tileset)
+        context.sdl_window.size = (cls.cols * font[1][0], cls.rows * font[1][1])
+        if cls._instance.frames is not None:
+            cls._instance.font = tileset
+        cls.invalidate()
         # cls._instance = cls._context.new_console(order='F')
@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 from typing import Any
 
-import tcod.event
-
 quality_levels = {
     -2: ("broken", "brittle"),
     -1: ("flimsy", "worn"),
@@ -70,33 +68,6 @@ materials: dict[str, Any] = {
     },
 }
 
-# dictionary of 52 key mappings (a-zA-Z)- 26 for small letters
-# and 26 capital letters for either shift key
-letters = dict(
-    zip(
-        [(letter, tcod.event.KMOD_NONE) for letter in range(97, 97 + 26 + 1)], range(26)
-    )
-)
-letters.update(
-    dict(
-        zip(
-            [(letter, tcod.event.KMOD_LSHIFT) for letter in range(97, 97 + 26 + 1)],
-            range(26, 26 + 26),
-        )
-    )
-)
-letters.update(
-    dict(
-        zip(
-            [(letter, tcod.event.KMOD_RSHIFT) for letter in range(97, 97 + 26 + 1)],
-            range(26, 26 + 26),
-        )
-    )
-)
-
-scroll_names: dict[str, str] = {}
-potion_colors: dict[str, tuple[int, int, int]] = {}
-
 templates = [
     {
         "type": "weapon",
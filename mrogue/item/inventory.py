@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from heapq import merge
+from typing import TYPE_CHECKING, Any, Callable, Generic, Iterable, TypeVar, cast
+
+import mrogue
+
+if TYPE_CHECKING:
+    from mrogue.item.item import Item
+
+# what an Inventory holds, e.g. only Wearables in the one of equipped items
+ItemT = TypeVar("ItemT", bound="Item")
+
+
+def sort_key(attribute: str) -> Callable[[Item], tuple[Any, str]]:
+    return lambda i: (getattr(i, attribute), i.name)
+
+
+def merge_sorted(attribute: str, *inventories: Inventory[Any]) -> list[Item]:
+    return list(
+        merge(*(i.sorted_by(attribute) for i in inventories), key=sort_key(attribute))
+    )
+
+
+class Inventory(mrogue.Group, Generic[ItemT]):
+    # a Group of Items which keeps its totals, slot and stack indices up to date
+    def __init__(self, items: Iterable[ItemT] = ()) -> None:
+        super().__init__()
+        self.serial = mrogue.session.current().new_serial()
+        self.weight = 0.0
+        self.value = 0.0
+        self._slots: dict[str, dict[ItemT, None]] = {}
+        self._stacks: dict[str, ItemT] = {}
+        self._sorted: dict[str, list[ItemT]] = {}
+        for item in items:
+            self.add(item)
+
+    def __repr__(self) -> str:
+        return f"Inventory({list(self._members)})"
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {**self.__dict__, "_sorted": {}}
+
+    def fork(self, memo: dict[int, Any]) -> Inventory[ItemT]:
+        clone = super().fork(memo)
+        assert isinstance(clone, Inventory)
+        clone._slots = {
+            slot: {mrogue.forked(item, memo): None for item in items}
+            for slot, items in self._slots.items()
+        }
+        clone._stacks = {
+            key: mrogue.forked(item, memo) for key, item in self._stacks.items()
+        }
+        clone._sorted = {}
+        return clone
+
+    @staticmethod
+    def _counted(item: Item) -> tuple[float, float]:
+        return item.weight * item.amount, item.value * item.amount
+
+    # an Inventory holds Items only, the Entities it is given are taken as such
+    def add(self, entity: mrogue.Entity) -> None:
+        item = cast(ItemT, entity)
+        if item in self._members:
+            return
+        self._members[item] = counted = self._counted(item)
+        self.weight += counted[0]
+        self.value += counted[1]
+        self._slots.setdefault(item.slot, {})[item] = None
+        if item.stack_key:
+            self._stacks.setdefault(item.stack_key, item)
+        self._sorted.clear()
+
+    def discard(self, entity: mrogue.Entity) -> None:
+        item = cast(ItemT, entity)
+        if (counted := self._members.pop(item, None)) is None:
+            return
+        self.weight -= counted[0]
+        self.value -= counted[1]
+        del self._slots[item.slot][item]
+        if item.stack_key and self._stacks.get(item.stack_key) is item:
+            del self._stacks[item.stack_key]
+        self._sorted.clear()
+
+    def refresh(self, entity: mrogue.Entity) -> None:
+        item = cast(ItemT, entity)
+        if (counted := self._members.get(item)) is None:
+            return
+        self._members[item] = new_counted = self._counted(item)
+        self.weight += new_counted[0] - counted[0]
+        self.value += new_counted[1] - counted[1]
+        self._sorted.clear()
+
+    def in_slot(self, slot: str) -> list[ItemT]:
+        return list(self._slots.get(slot, ()))
+
+    def stack_for(self, item: Item) -> ItemT | None:
+        return self._stacks.get(item.stack_key) if item.stack_key else None
+
+    def sorted_by(self, attribute: str) -> list[ItemT]:
+        if attribute not in self._sorted:
+            self._sorted[attribute] = sorted(self, key=sort_key(attribute))
+        return self._sorted[attribute]
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
-from random import choice
+from copy import copy
+from typing import TYPE_CHECKING, Any
 
 import tcod
 import tcod.constants
@@ -10,28 +13,36 @@ import mrogue.item.data
 import mrogue.map
 import mrogue.message
 import mrogue.player
+import mrogue.session
 import mrogue.utils
 from mrogue import Point
 from mrogue.io import Color
+from mrogue.modifiers import Modifier
+
+if TYPE_CHECKING:
+    import mrogue.effects
 
 
 class Item(ABC, mrogue.Entity):
+    layer = "items"
     max_name = 39
 
     @abstractmethod
     def __init__(self, name: str, base_weight: float, base_value: float, icon: int):
         super().__init__()
         self.pos: Point | None
+        # set by the subclasses: the weight of one piece, the slot it's worn or used in
+        self.weight: float
+        self.slot: str
         self.base_weight = base_weight
         self.base_value = base_value
         self.identified_value = base_value
         self.value = base_value
         self.icon = icon
         self.background = (0, 0, 76)
-        # self.layer = 2
-        self.status_identified = False
-        self.name = name
-        self.amount = 1
+        self._identified = False
+        self.unidentified_name = name
+        self._amount = 1
         self.identified_name = name  # TEMP
 
     def __repr__(self) -> str:
@@ -41,20 +52,58 @@ class Item(ABC, mrogue.Entity):
         return f"{chr(self.icon)} '{self.name}' ({self.amount})"  # " [{self.color}]"
 
     def dropped(self, coordinates: Point) -> None:
-        self.add(mrogue.map.Dungeon.current_level.objects_on_map)
+        self.add(mrogue.map.Dungeon.current_level.entities)
         self.pos = coordinates
 
     def picked(self) -> None:
-        self.remove(mrogue.map.Dungeon.current_level.objects_on_map)
+        self.remove(mrogue.map.Dungeon.current_level.entities)
         self.pos = None
 
+    @property
+    def status_identified(self) -> bool:
+        return self._identified
+
+    @property
+    def name(self) -> str:
+        return (
+            self.identified_name if self.status_identified else self.unidentified_name
+        )
+
     def identified(self) -> None:
-        self.status_identified = True
-        self.name = self.identified_name
+        self._identified = True
         self.value = self.identified_value
+        self.invalidate_interface_name()
+        self.changed()
+
+    @property
+    def amount(self) -> int:
+        return self._amount
+
+    @amount.setter
+    def amount(self, value: int) -> None:
+        self._amount = value
+        self.invalidate_interface_name()
+        self.changed()
+
+    @property
+    def stack_key(self) -> str | None:
+        # Items sharing a stack key are merged into one stack when carried
+        return None
+
+    def invalidate_interface_name(self) -> None:
+        # to be called whenever name, amount, properties or equipped status change
+        self.__dict__.pop("_interface_name", None)
 
     @property
     def interface_name(self) -> tuple[str, tuple[int, int, int]]:
+        # identification status is part of the key, as Consumables get identified in bulk
+        cached = self.__dict__.get("_interface_name")
+        if cached is None or cached[0] != self.status_identified:
+            cached = self.status_identified, self._compose_interface_name()
+            self.__dict__["_interface_name"] = cached
+        return cached[1]
+
+    def _compose_interface_name(self) -> tuple[str, tuple[int, int, int]]:
         color = Color.white
         prefix = ""
         suffix = ""
@@ -132,15 +181,39 @@ class Wearable(Item):
         self.slot = slot
         quality_word = mrogue.item.data.quality_levels[self.quality]
         if type(quality_word) == tuple:
-            quality_word = choice(quality_word)
+            quality_word = mrogue.session.rng().choice(quality_word)
         enchantment_word = mrogue.item.data.enchantment_levels[self.enchantment_level]
-        self.identified_name = f"{quality_word} {enchantment_word} {self.name}".strip()
+        self.identified_name = (
+            f"{quality_word} {enchantment_word} {self.unidentified_name}".strip()
+        )
         self.identified_name = " ".join(self.identified_name.split())
         self.props = props
 
     def __repr__(self) -> str:
         return f"Wearable('{self.name}', {type(self.props)}, 0x{self.icon:x})"  # ", {self.color})"
 
+    def fork(self, memo: dict[int, Any]) -> Wearable:
+        # enchanting changes props in place
+        clone = super().fork(memo)
+        assert isinstance(clone, Wearable)
+        clone.props = copy(self.props)
+        return clone
+
+    def modifiers(self, wearer: mrogue.unit.Unit) -> list[Modifier]:
+        if isinstance(self.props, Wearable.Weapon):
+            return [
+                Modifier("to_hit", self.props.to_hit_modifier),
+                Modifier(
+                    "damage_dice",
+                    (
+                        self.props.damage[0] + wearer.abilities["str"].mod,
+                        self.props.damage[1] + wearer.abilities["str"].mod,
+                    ),
+                    "set",
+                ),
+            ]
+        return [Modifier("armor_class", self.props.armor_class_modifier)]
+
     def upgrade_enchantment(self, amount: int) -> None:
         if self.enchantment_level > 1:
             raise ValueError("Item already at max ench. level.")
@@ -152,11 +225,12 @@ class Wearable(Item):
         )
         quality = mrogue.item.data.quality_levels[self.quality]
         if type(quality) == tuple:
-            quality = choice(quality)
+            quality = mrogue.session.rng().choice(quality)
         enchantment = mrogue.item.data.enchantment_levels[self.enchantment_level]
-        self.identified_name = f"{quality} {enchantment} {self.name}".strip()
+        self.identified_name = (
+            f"{quality} {enchantment} {self.unidentified_name}".strip()
+        )
         self.identified_name = " ".join(self.identified_name.split())
-        self.name = self.identified_name
         if isinstance(self.props, Wearable.Weapon):
             speed = self.props.speed_modifier
             to_hit = self.props.base_to_hit
@@ -167,13 +241,14 @@ class Wearable(Item):
         else:
             ac_mod = self.props.base_armor_class
             self.props = Wearable.Armor(self.quality, self.enchantment_level, ac_mod)
+        self.invalidate_interface_name()
 
     def upgrade_armor(self, amount: int) -> None:
         if type(self.props) != Wearable.Armor:
             raise ValueError("Can't upgrade armor on non-armor items.")
         self.props.armor_class_modifier += amount
         self.identified_name = "fortified " + self.identified_name
-        self.name = self.identified_name
+        self.invalidate_interface_name()
 
 
 class Stackable(Item):
@@ -183,8 +258,13 @@ class Stackable(Item):
     ):
         super().__init__(name, base_weight, base_value, icon)
         self.amount = amount
-        self.weight = self.base_weight * self.amount
-        self.value = self.base_value * self.amount
+        # weight and value are given per piece, carried totals multiply them by amount
+        self.weight = self.base_weight
+        self.value = self.base_value
+
+    @property
+    def stack_key(self) -> str | None:
+        return self.unidentified_name
 
     # @property
     # def s_name(self):
@@ -208,7 +288,7 @@ class Consumable(Stackable):
         icon: int,
         amount: int,
         color: tuple[int, int, int],
-        effect: str,
+        effect: mrogue.effects.Effect,
         id_name: str,
         subtype: str,
     ):
@@ -218,42 +298,24 @@ class Consumable(Stackable):
         self.color = color
         self.effect = effect
         # self.uses = template['number_of_uses']
-        if self.name in mrogue.player.Player.get().identified_consumables:
-            self.identified()
         self.subtype = subtype
 
     def __repr__(self) -> str:
         return f"Consumable('{self.name}', {self.subtype}, 0x{self.icon:x})"  # ", {self.color})"
 
-    def used(self, target: mrogue.unit.Unit) -> str:
+    async def used(self, target: mrogue.unit.Unit) -> str:
         self.identified()
         mrogue.message.Messenger.add("This is {}.".format(self.name))
         self.amount -= 1
         if self.amount == 0:
             self.kill()
+        return await self.effect.apply(self, target)
 
-        from mrogue.effects import Effect
-
-        effect = Effect(self, target)
-        return effect.apply()
+    @property
+    def status_identified(self) -> bool:
+        # all Consumables with the same effect are identified at once, wherever they are
+        return self.effect.text in mrogue.player.Player.get().identified_consumables
 
     def identified(self) -> None:
-        mrogue.player.Player.get().identified_consumables.append(self.name)
-        super().identified()
-        self.identify_all()
-
-    def identify_all(self) -> None:
-        for i in mrogue.map.Dungeon.current_level.objects_on_map:
-            if (
-                isinstance(i, Consumable)
-                and not i.status_identified
-                and i.effect == self.effect
-            ):
-                i.identified()
-        for i in mrogue.player.Player.get().inventory:
-            if (
-                isinstance(i, Consumable)
-                and not i.status_identified
-                and i.effect == self.effect
-            ):
-                i.identified()
+        mrogue.player.Player.get().identified_consumables.add(self.effect.text)
+        self.changed()
@@ -2,13 +2,13 @@
 from __future__ import annotations
 
 import string
-from random import choice, choices
 from typing import Any, Callable
 
 import tcod
 import tcod.constants
 import tcod.event
 
+import mrogue.session
 import mrogue.utils
 from mrogue import Point
 from mrogue.io import Color
@@ -16,6 +16,7 @@ from mrogue.map import Dungeon
 from mrogue.player import Player
 
 from . import data, item, template
+from .inventory import merge_sorted
 
 
 class ItemManager:
@@ -23,22 +24,21 @@ class ItemManager:
     item_selection: dict[int, dict[str, Any]] = {}
 
     def __init__(self) -> None:
+        session = mrogue.session.current()
         for s in filter(lambda x: x["type"] == "scroll", data.templates):
-            data.scroll_names[s["name"]] = mrogue.utils.random_scroll_name()  # type: ignore[index]
+            session.scroll_names[s["name"]] = (  # type: ignore[index]
+                mrogue.utils.random_scroll_name()
+            )
         for p in filter(lambda x: x["type"] == "potion", data.templates):
-            data.potion_colors[p["name"]] = choice(  # type: ignore[index]
+            session.potion_colors[p["name"]] = mrogue.session.rng().choice(  # type: ignore[index]
                 list(data.materials["potions"].items())
             )
         self.screen = mrogue.io.Screen.get()
-        for t in data.templates:
-            template.ItemTemplate(t)
+        # templates are the same for every game, so only the first one builds them
+        if not template.ItemTemplate.all():
+            for t in data.templates:
+                template.ItemTemplate(t)
         ItemManager.blueprints = template.ItemTemplate.all()
-        for level in range(9):
-            ItemManager.item_selection[level] = dict()
-            budget_bounds = (level // 2) * 10, level * 5 + 10
-            ItemManager.item_selection[level]["budget"] = list(
-                range(budget_bounds[0], budget_bounds[1] + 1)
-            )
 
     @classmethod
     def create_loot(cls, num_items: int) -> None:
@@ -47,6 +47,10 @@ class ItemManager:
 
     @classmethod
     def prepare_selection_for_level(cls, level: int) -> None:
+        # filled in before it is published, as games in other threads may look it up
+        selection: dict[str, Any] = dict()
+        budget_bounds = (level // 2) * 10, level * 5 + 10
+        selection["budget"] = list(range(budget_bounds[0], budget_bounds[1] + 1))
         templates: list[template.ItemTemplate] = []
         for item_template in cls.blueprints.values():
             if type(item_template) in (
@@ -57,11 +61,10 @@ class ItemManager:
             else:  # if random, match all possible budget versions against the target budget
                 budget_grain = {item_template.budget(i) for i in range(-2, 3)}
                 if (
-                    set(cls.item_selection[level]["budget"]).intersection(budget_grain)
-                    != set()
+                    set(selection["budget"]).intersection(budget_grain) != set()
                 ):  # if they overlap
                     templates.append(item_template)
-        cls.item_selection[level]["ungrouped"] = templates
+        selection["ungrouped"] = templates
         # group templates by type
         template_groups = {
             tpl.__class__.__name__: [
@@ -71,27 +74,28 @@ class ItemManager:
             ]
             for tpl in templates
         }
-        cls.item_selection[level]["grouped"] = template_groups
+        selection["grouped"] = template_groups
+        cls.item_selection[level] = selection
 
     @classmethod
     def random_item(
-        cls, keyword: str = None, groups: list[list[item.Item]] = None
+        cls, keyword: str | None = None, groups: mrogue.Group | None = None
     ) -> item.Item:
         level = Dungeon.depth()
-        if "templates" not in cls.item_selection[level]:
+        if level not in cls.item_selection:
             cls.prepare_selection_for_level(level)
         grouped = cls.item_selection[level]["grouped"]
         ungrouped = cls.item_selection[level]["ungrouped"]
         if keyword:
             # random choice from templates containing a specific keyword
-            target = choice(
+            target = mrogue.session.rng().choice(
                 list(filter(lambda x: keyword in getattr(x, "keywords", []), ungrouped))
             )
         else:
-            item_type = choices(
+            item_type = mrogue.session.rng().choices(
                 list(grouped.keys()), [5, 4, 2, 3]
             )  # weapons:armor:scrolls:potions ratio
-            target = choice(grouped[item_type[0]])
+            target = mrogue.session.rng().choice(grouped[item_type[0]])
         budget_min, budget_max = (
             cls.item_selection[level]["budget"][0],
             cls.item_selection[level]["budget"][-1],
@@ -103,51 +107,34 @@ class ItemManager:
     @staticmethod
     def get_item_on_map(coordinates: Point) -> list[item.Item]:
         return mrogue.utils.find_in(
-            Dungeon.current_level.objects_on_map,
+            Dungeon.current_level.entities.items,
             "pos",
             coordinates,
-            item.Item,
-            True,
+            many=True,
         )
 
     @staticmethod
-    def print_list(
-        inventory: list[item.Item],
-        scroll: int,
-        width: int,
-        limit: int,
-        show_details: bool = False,
-    ) -> tcod.Console:
-        window = tcod.Console(width, limit)
-        # window.draw_frame(0, 0, window.width, window.height)
-        if scroll > 0:
-            window.print(0, 0, chr(0x2191), Color.black, Color.white)
-        for i in range(len(inventory)):
-            if i > limit - 1:
-                break
-            it = inventory[i + scroll]
-            window.print(1, i, f"{string.ascii_letters[i+scroll]}) ")
-            window.print(4, i, chr(it.icon), it.color)
-            window.print(6, i, *it.interface_name)
-            if show_details and type(it) == item.Wearable:
-                window.print(
-                    item.Item.max_name + 6,
-                    i,
-                    f"{it.slot:>6} {it.weight*it.amount:6.2f} {it.value*it.amount:>7.2f}",
-                )
-        if limit + scroll < len(inventory):
-            window.print(0, limit - 1, chr(0x2193), Color.black, Color.white)
-        return window
+    def print_item(
+        window: tcod.Console, x: int, y: int, it: item.Item, show_details: bool = False
+    ) -> None:
+        window.print(x, y, chr(it.icon), it.color)
+        window.print(x + 2, y, *it.interface_name)
+        if show_details and type(it) == item.Wearable:
+            window.print(
+                x + item.Item.max_name + 2,
+                y,
+                f"{it.slot:>6} {it.weight*it.amount:6.2f} {it.value*it.amount:>7.2f}",
+            )
 
     @staticmethod
     def print_inventory_ui(
-        window: tcod.Console, selected_sort: int, weight: int, value: int
+        window: tcod.Console, selected_sort: int, weight: float, value: float
     ) -> None:
         window.clear()
         window.draw_frame(0, 0, window.width, window.height, decoration="╔═╗║ ║╚═╝")
         window.print_box(0, 0, window.width, 1, " Inventory ", alignment=tcod.CENTER)
         window.print(2, 1, "Select an item or Esc to close:")
-        window.print(item.Item.max_name + 11, 1, "[/] Sort", Color.yellow)
+        window.print(item.Item.max_name + 11, 1, "[/] Sort [^F] Find", Color.yellow)
         window.print(6, 2, "Name", Color.lighter_gray)
         window.print(
             item.Item.max_name + 9, 2, "Slot     Wt     Val", Color.lighter_gray
@@ -160,7 +147,7 @@ class ItemManager:
             Color.lighter_gray,
         )
 
-    def show_inventory(self) -> bool:
+    async def show_inventory(self) -> bool:
         player = Player.get()
         # allow to sort the list by one of four attributes
         sorts = mrogue.utils.circular(
@@ -172,55 +159,52 @@ class ItemManager:
             ]
         )
         sort = next(sorts)
-        raw_inventory = player.inventory + player.equipped
-        total_items = len(raw_inventory)
-        item_limit, scroll = 14, 0
+        items = merge_sorted(sort[0], player.inventory, player.equipped)
         window_height, window_width = (
-            5 + min(total_items, item_limit),
+            5 + min(len(items), 14),
             item.Item.max_name + 30,
         )
-        total_weight, total_value = sum([i.weight for i in raw_inventory]), sum(
-            [i.value for i in raw_inventory]
-        )
-        inventory_window = tcod.Console(window_width, window_height, "F")
+        inventory = mrogue.io.ListView(items, window_height - 5, lambda i: i.name)
+        total_weight = player.inventory.weight + player.equipped.weight
+        total_value = player.inventory.value + player.equipped.value
+        inventory_window = mrogue.io.window("inventory", window_width, window_height)
         while True:
             # present the whole inventory screen
             self.print_inventory_ui(
                 inventory_window, sort[1], total_weight, total_value
             )
-            inventory = sorted(
-                raw_inventory, key=lambda x: (getattr(x, sort[0]), x.name)
+            inventory.draw(
+                inventory_window,
+                1,
+                3,
+                lambda window, x, y, it: self.print_item(window, x, y, it, True),
             )
-            self.print_list(
-                inventory, scroll, window_width - 2, window_height - 5, True
-            ).blit(inventory_window, 1, 3)
             inventory_window.blit(self.screen, 4, 4)
             self.screen.present()
             # wait for input
-            key = mrogue.io.wait()
+            key = await mrogue.io.wait()
+            if inventory.handle(key):
+                continue
             if key[1] & mrogue.io.ignore_mods == mrogue.io.ignore_mods:
                 key = (key[0], key[1] - mrogue.io.ignore_mods)
             if mrogue.io.key_is(key, tcod.event.K_ESCAPE):
                 return False
-            elif mrogue.io.key_is(key, tcod.event.K_DOWN):
-                scroll += 1 if item_limit + scroll < total_items else 0
-            elif mrogue.io.key_is(key, tcod.event.K_UP):
-                scroll -= 1 if scroll > 0 else 0
             elif mrogue.io.key_is(key, tcod.event.K_SLASH):
                 sort = next(sorts)
+                inventory.update(
+                    merge_sorted(sort[0], player.inventory, player.equipped)
+                )
             # if an a-zA-z key was pressed and it represents an item on the list:
-            elif key in data.letters and data.letters[key] in range(total_items):
+            elif (i := inventory.selected(key)) is not None:
                 # highlight selected item and present context actions
-                i = inventory[data.letters[key]]
-                highlight_line = 3 + data.letters[key] - scroll
+                highlight_line = 3 + inventory.shown.index(i) - inventory.scroll
                 if 3 <= highlight_line <= window_height - 3:
                     inventory_window.draw_rect(
                         1, highlight_line, window_width - 2, 1, 0, bg=Color.blue
                     )
                     inventory_window.blit(self.screen, 4, 4)
-                context_actions: list[
-                    tuple[str, item.Item, Callable[[None], None]]
-                ] = []
+                # actions taking the item: use, (un)equip or drop
+                context_actions: list[tuple[str, Any, Callable[[Any], Any]]] = []
                 if isinstance(i, item.Consumable):
                     context_actions.append(("Use item", i, player.use))
                 elif i in player.equipped:
@@ -229,15 +213,15 @@ class ItemManager:
                     context_actions.append(("Equip item", i, player.equip))
                 if i not in player.equipped:
                     context_actions.append(("Drop item", i, player.drop_item))
-                effect = mrogue.io.select_action(context_actions)
+                effect = await mrogue.io.select_action(context_actions)
                 if effect[0]:
                     return effect[1] if effect[1] is not None else True
 
-    def show_equipment(self) -> bool:
+    async def show_equipment(self) -> bool:
         player = Player.get()
         width, height = item.Item.max_name + 12, 12
         slots = ("main", "both", "off", "head", "chest", "feet", "legs", "hands")
-        window = tcod.Console(width, height, "F")
+        window = mrogue.io.window("equipment", width, height)
         while True:
             # present the whole equipment window
             window.clear()
@@ -246,7 +230,7 @@ class ItemManager:
             window.print(2, 1, "Select a slot to manage or Esc to close:")
             for line, slot in enumerate(slots):
                 window.print(2, line + 3, f"{chr(97 + line)}) {slot.capitalize():>5}:")
-                it = mrogue.utils.find_in(player.equipped, "slot", slot)
+                it = player.in_slot(slot)
                 if it:
                     name, _ = it.interface_name
                     window.print(12, line + 3, chr(it.icon), it.color)
@@ -259,62 +243,61 @@ class ItemManager:
             window.blit(self.screen, 4, 4)
             self.screen.present()
             # wait for input
-            key = mrogue.io.wait()
+            key = await mrogue.io.wait()
             if key[1] & mrogue.io.ignore_mods == mrogue.io.ignore_mods:
                 key = (key[0], key[1] - mrogue.io.ignore_mods)
             if mrogue.io.key_is(key, tcod.event.K_ESCAPE):
                 return False
             # if a-z was pressed and it represents one of the slots:
             elif key[0] in range(97, 97 + len(slots)):
-                it = mrogue.utils.find_in(player.equipped, "slot", slots[key[0] - 97])
+                it = player.in_slot(slots[key[0] - 97])
                 if it:
                     return player.unequip(it)
                 else:
                     # if the slot is empty, highlight it and present list of available items
-                    items = list(
-                        filter(
-                            lambda x: x.slot == slots[key[0] - 97],
-                            player.inventory,
-                        )
-                    )
+                    items = [
+                        i
+                        for i in player.inventory.in_slot(slots[key[0] - 97])
+                        if isinstance(i, item.Wearable)
+                    ]
                     if not items:
                         continue
                     items.sort(key=lambda x: (getattr(x, "enchantment_level"), x.name))
                     window.draw_rect(1, 3 + key[0] - 97, width - 2, 1, 0, bg=Color.blue)
                     window.blit(self.screen, 4, 4)
-                    total_items = len(items)
-                    limit, scroll = 10, 0
-                    selection = tcod.Console(
-                        item.Item.max_name + 9, 2 + min(limit, total_items), "F"
+                    choice = mrogue.io.ListView(
+                        items, min(10, len(items)), lambda i: i.name
                     )
-                    selection.draw_frame(
-                        0, 0, selection.width, selection.height, "Select item to equip:"
+                    selection = mrogue.io.window(
+                        "equip_choice", item.Item.max_name + 9, 2 + choice.height
                     )
                     while True:
-                        self.print_list(
-                            items, scroll, selection.width - 2, selection.height - 2
-                        ).blit(selection, 1, 1)
+                        selection.clear()
+                        selection.draw_frame(
+                            0,
+                            0,
+                            selection.width,
+                            selection.height,
+                            "Select item to equip:",
+                        )
+                        choice.draw(selection, 1, 1, self.print_item)
                         selection.blit(self.screen, 4 + 10, 4 + 2)
                         self.screen.present()
-                        selected = mrogue.io.wait()
+                        selected = await mrogue.io.wait()
+                        if choice.handle(selected):
+                            continue
                         if mrogue.io.key_is(selected, tcod.event.K_ESCAPE):
                             break
-                        elif mrogue.io.key_is(selected, tcod.event.K_DOWN):
-                            scroll += 1 if limit + scroll < total_items else 0
-                        elif mrogue.io.key_is(selected, tcod.event.K_UP):
-                            scroll -= 1 if scroll > 0 else 0
-                        elif selected[0] in range(97, 97 + total_items):
-                            player.equip(items[selected[0] - 97])
+                        elif (chosen := choice.selected(selected)) is not None:
+                            player.equip(chosen)
                             return True
 
-    def show_pickup_choice(
-        self, items: list[item.Item]
-    ) -> item.Item | list[item.Item] | bool:
-        total = len(items)
-        w, limit, scroll = item.Item.max_name + 9, 6, 0
-        h = 3 + min(limit, total)
-        char = string.ascii_letters[total - 1]
-        window = tcod.Console(w, h, "F")
+    async def show_pickup_choice(self, items: list[item.Item]) -> list[item.Item]:
+        # the items chosen, none if the player changed their mind
+        choice = mrogue.io.ListView(items, min(6, len(items)), lambda i: i.name)
+        w, h = item.Item.max_name + 9, 3 + choice.height
+        char = string.ascii_letters[min(len(items), len(string.ascii_letters)) - 1]
+        window = mrogue.io.window("pickup", w, h)
         while True:
             window.clear()
             window.draw_frame(0, 0, w, h, decoration="╔═╗║ ║╚═╝")
@@ -328,21 +311,19 @@ class ItemManager:
                 Color.light_gray,
                 alignment=tcod.CENTER,
             )
-            self.print_list(items, scroll, w - 2, h - 3).blit(window, 1, 2)
+            choice.draw(window, 1, 2, self.print_item)
             window.blit(
                 self.screen, self.screen.width - w - 1, self.screen.height - h - 1
             )
             self.screen.present()
-            key = mrogue.io.wait()
+            key = await mrogue.io.wait()
+            if choice.handle(key):
+                continue
             if key[1] & mrogue.io.ignore_mods == mrogue.io.ignore_mods:
                 key = (key[0], key[1] - mrogue.io.ignore_mods)
             if mrogue.io.key_is(key, tcod.event.K_ESCAPE):
-                return False
+                return []
             elif mrogue.io.key_is(key, tcod.event.K_COMMA):
                 return items
-            elif key[0] in range(97, 97 + total):
-                return [items[key[0] - 97]]
-            elif mrogue.io.key_is(key, tcod.event.K_DOWN):
-                scroll += 1 if limit + scroll < total else 0
-            elif mrogue.io.key_is(key, tcod.event.K_UP):
-                scroll -= 1 if scroll > 0 else 0
+            elif (it := choice.selected(key)) is not None:
+                return [it]
@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from random import choice, choices
 from typing import Any
 
 import tcod.constants
 
+import mrogue.session
+from mrogue.effects import Effect
+
 from . import data, item
 
 
@@ -37,8 +39,12 @@ class ItemTemplate:
 
     @staticmethod
     def randomize() -> tuple[int, int]:
-        enchantment = choices(list(data.enchantment_levels.keys()), [1, 2, 10, 2, 1])
-        quality = choices(list(data.quality_levels.keys()), [1, 3, 10, 3, 1])
+        enchantment = mrogue.session.rng().choices(
+            list(data.enchantment_levels.keys()), [1, 2, 10, 2, 1]
+        )
+        quality = mrogue.session.rng().choices(
+            list(data.quality_levels.keys()), [1, 3, 10, 3, 1]
+        )
         return quality[0], enchantment[0]
 
     @classmethod
@@ -72,7 +78,9 @@ class WeaponTemplate(ItemTemplate, type="weapon"):
         self, random: bool = False, min_budget: int = 0, max_budget: int = 10
     ) -> item.Wearable:
         if random:
-            mat_name, mat_mods = choice(list(data.materials["weapons"].items()))
+            mat_name, mat_mods = mrogue.session.rng().choice(
+                list(data.materials["weapons"].items())
+            )
             name = f"{mat_name} {self.name}"
             material = mat_mods
             quality, enchantment = 0, 0
@@ -141,7 +149,7 @@ class ArmorTemplate(ItemTemplate, type="armor"):
                 materials = data.materials["armor"][self.keywords[0]]
             else:
                 materials = self.all_materials
-            mat_name, mat_mods = choice(list(materials.items()))
+            mat_name, mat_mods = mrogue.session.rng().choice(list(materials.items()))
             name = f"{mat_name} {self.name}"
             material = mat_mods
             quality, enchantment = 0, 0
@@ -160,10 +168,11 @@ class ArmorTemplate(ItemTemplate, type="armor"):
                 "armor",
                 props,
             )
-        self.name = f"{self._template['material']} {self.name}"
+        # templates are shared, the name must not be changed for the next Item
+        name = f"{self._template['material']} {self.name}"
         props = item.Wearable.Armor(0, 0, self.ac)
         return item.Wearable(
-            self.name,
+            name,
             self.weight,
             self.value,
             self.icon,
@@ -180,13 +189,13 @@ class ScrollTemplate(ItemTemplate, type="scroll"):
     def __init__(self, *args):
         super().__init__()
         self.color = self._template["color"]
-        self.effect = self._template["effect"]
+        self.effect = Effect.compile(self._template["effect"])
         self.uses = self._template["number_of_uses"]
         super()._templates[self.name] = self
 
     def create(self, *args) -> item.Consumable:
         color = vars(tcod.constants)[self.color]
-        name = f"scroll titled {data.scroll_names[self.name]}"
+        name = f"scroll titled {mrogue.session.current().scroll_names[self.name]}"
         id_name = f"scroll of {self.name}"
         return item.Consumable(
             name,
@@ -204,13 +213,13 @@ class ScrollTemplate(ItemTemplate, type="scroll"):
 class PotionTemplate(ItemTemplate, type="potion"):
     def __init__(self, *args):
         super().__init__()
-        self.effect = self._template["effect"]
+        self.effect = Effect.compile(self._template["effect"])
         self.uses = self._template["number_of_uses"]
         super()._templates[self.name] = self
 
     def create(self, *args) -> item.Consumable:
-        color = data.potion_colors[self.name][1]
-        name = f"{data.potion_colors[self.name][0]} potion"
+        appearance, color = mrogue.session.current().potion_colors[self.name]
+        name = f"{appearance} potion"
         id_name = f"potion of {self.name}"
         return item.Consumable(
             name,
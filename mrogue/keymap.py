@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from configparser import ConfigParser
+from os import path
+
+import tcod.event
+
+import mrogue
+from mrogue import Point
+
+modifiers = {
+    "shift": int(tcod.event.KMOD_SHIFT),
+    "ctrl": int(tcod.event.KMOD_CTRL),
+    "alt": int(tcod.event.KMOD_ALT),
+}
+
+# bindings are space separated, single characters stand for their own key
+default_commands = {
+    "inventory": "i",
+    "equipment": "e",
+    "pickup": ",",
+    "descend": "shift+.",
+    "ascend": "shift+,",
+    "messages": "shift+m",
+    "help": "shift+h",
+    "quit": "shift+q",
+    "save": "shift+s",
+    "change_font": "ctrl+r",
+}
+
+# direction keys move the player, with Shift held they start autorun
+default_directions = {
+    "northwest": "kp_7 7",
+    "north": "up kp_8 8",
+    "northeast": "kp_9 9",
+    "west": "left kp_4 4",
+    "wait": "kp_5 5",
+    "east": "right kp_6 6",
+    "southwest": "kp_1 1",
+    "south": "down kp_2 2",
+    "southeast": "kp_3 3",
+}
+
+compass = {
+    "northwest": Point(-1, -1),
+    "north": Point(0, -1),
+    "northeast": Point(1, -1),
+    "west": Point(-1, 0),
+    "wait": Point(0, 0),
+    "east": Point(1, 0),
+    "southwest": Point(-1, 1),
+    "south": Point(0, 1),
+    "southeast": Point(1, 1),
+}
+
+
+def normalized(key: tuple[int, int]) -> tuple[int, int]:
+    # left and right modifier keys count the same, locks (num, caps) are ignored
+    sym, mod = key
+    return sym, sum(mask for mask in modifiers.values() if mod & mask)
+
+
+def parse(binding: str) -> tuple[int, int]:
+    *mods, name = binding.lower().split("+")
+    try:
+        sym = ord(name) if len(name) == 1 else tcod.event.KeySym[name.upper()]
+        return int(sym), sum(modifiers[mod] for mod in mods)
+    except KeyError as error:
+        raise ValueError(f"Unknown key in binding '{binding}'.") from error
+
+
+class Keymap:
+    def __init__(self, config_file: str = path.join(mrogue.work_dir, "keymap.ini")):
+        commands = dict(default_commands)
+        directions = dict(default_directions)
+        # players can rebind keys in the [commands] and [directions] sections
+        if path.isfile(config_file):
+            config = ConfigParser()
+            config.read(config_file)
+            for section, bindings in (
+                ("commands", commands),
+                ("directions", directions),
+            ):
+                if config.has_section(section):
+                    bindings.update(
+                        (name, keys)
+                        for name, keys in config.items(section)
+                        if name in bindings
+                    )
+        self.commands: dict[tuple[int, int], str] = {}
+        self.deltas: dict[int, Point] = {}
+        for name, keys in directions.items():
+            for sym, mod in map(parse, keys.split()):
+                self.deltas[sym] = compass[name]
+                self.commands[sym, mod] = "move"
+                self.commands[sym, mod | modifiers["shift"]] = "run"
+        for name, keys in commands.items():
+            for key in map(parse, keys.split()):
+                self.commands[key] = name
+
+    def command(self, key: tuple[int, int]) -> str | None:
+        return self.commands.get(normalized(key))
+
+    def step(self, key: tuple[int, int], pos: Point) -> Point:
+        delta = self.deltas[key[0]]
+        return Point(pos.x + delta.x, pos.y + delta.y)
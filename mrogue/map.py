@@ -1,22 +1,25 @@
 # -*- coding: utf-8 -*-
 import random
-from collections import defaultdict
+import zlib
 from os import path
 from sys import argv
-from typing import Callable
+from typing import Any, Callable, Iterable
 
 import numpy as np
 import tcod.bsp
 import tcod.map
+import tcod.random
 
 import mrogue.io
 import mrogue.item.item
 import mrogue.message
 import mrogue.monster
 import mrogue.player
+import mrogue.session
 import mrogue.unit
 import mrogue.utils
 from mrogue import Point
+from mrogue.session import SessionAttribute
 
 tiles = {
     "wall": mrogue.io.Tile(
@@ -44,6 +47,10 @@ tiles = {
         dim=(0x2264, (64, 64, 0, 255), (0, 0, 0, 255)),
     ),
 }
+nothing = np.asarray((0, (0, 0, 0, 0), (0, 0, 0, 0)), dtype=tcod.console.rgba_graphic)
+item_heap = np.asarray(
+    (0x25, (*tcod.gray, 255), (*tcod.blue * 0.3, 255)), dtype=tcod.console.rgba_graphic
+)
 compare = {
     "wall": np.asarray(tiles["wall"], dtype=mrogue.io.tile_dt),
     "floor": np.asarray(tiles["floor"], dtype=mrogue.io.tile_dt),
@@ -52,21 +59,36 @@ compare = {
 }
 
 
+def gather(
+    entities: Iterable[Any], fov: np.ndarray | None = None
+) -> tuple[tuple[np.ndarray, np.ndarray], np.ndarray]:
+    # collect positions and packed graphics of Entities on the map (and in sight, if fov given)
+    on_map = [e for e in entities if e.pos]
+    positions = np.array([e.pos for e in on_map], dtype=np.intp).reshape(-1, 2)
+    graphics = np.array(
+        [e.graphic for e in on_map], dtype=tcod.console.rgba_graphic
+    ).reshape(-1)
+    if fov is not None:
+        visible = fov[positions[:, 0], positions[:, 1]]
+        positions, graphics = positions[visible], graphics[visible]
+    return (positions[:, 0], positions[:, 1]), graphics
+
+
 class Level:
     class Room:
-        rooms_list = []
-
-        def __init__(self, col, row, x, y, w, h):
+        def __init__(self, rooms, col, row, x, y, w, h):
             self.col, self.row = col, row
             self.x, self.y = col + x, row + y
             self.width, self.height = w, h
             self.is_connected = False
             self.connected = []
-            Level.Room.rooms_list.append(self)
+            # all the rooms of the Level being generated, this one included
+            self.rooms = rooms
+            rooms.append(self)
 
         def get_neighbors(self):
-            rooms_in_row = [r for r in Level.Room.rooms_list if r.row == self.row]
-            rooms_in_col = [r for r in Level.Room.rooms_list if r.col == self.col]
+            rooms_in_row = [r for r in self.rooms if r.row == self.row]
+            rooms_in_col = [r for r in self.rooms if r.col == self.col]
             row_index = rooms_in_row.index(self)
             col_index = rooms_in_col.index(self)
             neighbors = []
@@ -94,57 +116,102 @@ class Level:
 
     def __init__(self, dimensions: Point):
         self.mapDim = dimensions
-        self.objects_on_map = []
-        self.units = []
-        self.pos = None
+        self.entities = mrogue.EntityRegistry()
+        self.serial = mrogue.session.current().new_serial()
+        self.layout_hash: int | None = None
+        self.pos: Point | None = None
         self.floor = None
+        # depth, number of objects and first serial of a Level made by Dungeon.generate
+        self.origin: tuple[int, int, int] | None = None
 
         # first, everything is solid
         self.tiles = np.empty(self.mapDim, mrogue.io.tile_dt, "F")
         self.tiles[:] = tiles["wall"]
         self.explored = np.zeros(self.mapDim, bool, "F")
 
+    def fork(self, memo: dict[int, Any]) -> "Level":
+        # the generated layout is shared read-only, see writable_tiles
+        clone = memo[id(self)] = Level.__new__(Level)
+        clone.__dict__.update(self.__dict__)
+        if self.paged:
+            # filled in when the fork pages it in from its copy of the LevelStore
+            registry = mrogue.EntityRegistry.__new__(mrogue.EntityRegistry)
+            clone.entities = memo[id(self.entities)] = registry
+            return clone
+        self.tiles.flags.writeable = False
+        clone.explored = self.explored.copy(order="F")
+        clone.entities = mrogue.forked(self.entities, memo)
+        return clone
+
+    @property
+    def paged(self) -> bool:
+        # only an empty shell is left while the Level is on disk, see mrogue.paging
+        return "tiles" not in self.__dict__
+
+    def writable_tiles(self) -> np.ndarray:
+        # copy on write, for changing the layout of a Level which may share it with forks
+        if not self.tiles.flags.writeable:
+            self.tiles = self.tiles.copy(order="F")
+        return self.tiles
+
+    def set_tile(self, where: Point, tile: Any) -> None:
+        self.writable_tiles()[where] = tile
+        self.hash_layout()
+
+    def hash_layout(self) -> None:
+        # the layout counts in the state hash as a whole, it changes rarely after generation
+        session = mrogue.session.current()
+        if self.layout_hash is not None:
+            session.toggle(
+                self.serial, mrogue.session.hash_codes["tiles"], self.layout_hash
+            )
+        self.layout_hash = zlib.crc32(self.tiles.tobytes())
+        session.toggle(
+            self.serial, mrogue.session.hash_codes["tiles"], self.layout_hash
+        )
+
     def create_level(self, first: bool = False) -> None:
         # create layout using one of the methods
         methods = [self.create_level_grid, self.create_level_bsp]
-        self.floor = random.choice(methods)()
+        self.floor = mrogue.session.rng().choice(methods)()
 
         dim = 0.2
-        for x in range(self.mapDim.x):
-            for y in range(self.mapDim.y):
-                random_grey = random.randint(96, 128)
-                one_shade_of_grey = tcod.Color(random_grey, random_grey, random_grey)
-                self.tiles[x, y]["lit"][1][:3] = one_shade_of_grey  # fg
-                self.tiles[x, y]["lit"][2][:3] = one_shade_of_grey * 0.2  # bg
-                self.tiles[x, y]["dim"][1][:3] = one_shade_of_grey * dim  # fg
-                self.tiles[x, y]["dim"][2][:3] = one_shade_of_grey * dim * 0.2  # bg
+        # shade the whole level at once, seeded from the game's generator so levels stay
+        # reproducible
+        rng = np.random.default_rng(mrogue.session.rng().getrandbits(64))
+        one_shade_of_grey = rng.integers(96, 128, self.mapDim, endpoint=True)[..., None]
+        self.tiles["lit"]["fg"][..., :3] = one_shade_of_grey
+        self.tiles["lit"]["bg"][..., :3] = one_shade_of_grey * 0.2
+        self.tiles["dim"]["fg"][..., :3] = one_shade_of_grey * dim
+        self.tiles["dim"]["bg"][..., :3] = one_shade_of_grey * dim * 0.2
 
         # select coordinates for stairs and place them
         if not first:
             self.tiles[self.stairs_up_pos] = tiles["stairs_up"]
             self.pos = self.stairs_up_pos
         self.tiles[self.stairs_down_pos] = tiles["stairs_down"]
+        self.hash_layout()
 
     def create_level_grid(self) -> list[tuple]:
-        self.Room.rooms_list = []
+        rooms: list[Level.Room] = []
         max_cell_width, max_cell_height = 18, 8
         for j in range(2, self.mapDim.y, max_cell_height + 1):
             for i in range(1, self.mapDim.x, max_cell_width + 1):
                 if (i + max_cell_width + 1 < self.mapDim.x) and (
                     j + max_cell_height + 1 < self.mapDim.y
                 ):
-                    x, y = random.randint(0, max_cell_width // 2), random.randint(
-                        0, max_cell_height // 2
-                    )
-                    width, height = random.randint(
+                    x, y = mrogue.session.rng().randint(
+                        0, max_cell_width // 2
+                    ), mrogue.session.rng().randint(0, max_cell_height // 2)
+                    width, height = mrogue.session.rng().randint(
                         3, max_cell_width - x
-                    ), random.randint(3, max_cell_height - y)
+                    ), mrogue.session.rng().randint(3, max_cell_height - y)
                     self.tiles[i + x : i + x + width, j + y : j + y + height] = tiles[
                         "floor"
                     ]
-                    self.Room(i, j, x, y, width, height)
+                    self.Room(rooms, i, j, x, y, width, height)
 
-        room = random.choice(self.Room.rooms_list)
+        room = mrogue.session.rng().choice(rooms)
         room.is_connected = True
         self.stairs_up_pos = Point(
             mrogue.utils.roll(room.x + 1, room.x + room.width - 1),
@@ -155,24 +222,20 @@ class Level:
             filter(lambda x: not x.is_connected, room.get_neighbors())
         )
         while any(unconnected_neighbors):
-            new_room = random.choice(unconnected_neighbors)
+            new_room = mrogue.session.rng().choice(unconnected_neighbors)
             room.connect(new_room, self)
             room = new_room
             unconnected_neighbors = list(
                 filter(lambda x: not x.is_connected, room.get_neighbors())
             )
 
-        unconnected_rooms = list(
-            filter(lambda x: not x.is_connected, self.Room.rooms_list)
-        )
+        unconnected_rooms = list(filter(lambda x: not x.is_connected, rooms))
         while any(unconnected_rooms):
-            room = random.choice(unconnected_rooms)
+            room = mrogue.session.rng().choice(unconnected_rooms)
             if not any(cn := room.get_connected_neighbors()):
                 continue
-            room.connect(random.choice(cn), self)
-            unconnected_rooms = list(
-                filter(lambda x: not x.is_connected, self.Room.rooms_list)
-            )
+            room.connect(mrogue.session.rng().choice(cn), self)
+            unconnected_rooms = list(filter(lambda x: not x.is_connected, rooms))
         self.stairs_down_pos = Point(
             mrogue.utils.roll(room.x + 1, room.x + room.width - 1),
             mrogue.utils.roll(room.y + 1, room.y + room.height - 1),
@@ -183,7 +246,10 @@ class Level:
     def create_level_bsp(self) -> list[tuple]:
         # binary space partitioning
         bsp = tcod.bsp.BSP(0, 0, self.mapDim.x, self.mapDim.y)
-        bsp.split_recursive(4, 11, 8, 1.0, 1.0)
+        # seeded from the game's generator, libtcod's own would make levels unrepeatable;
+        # this tcod version hands the seed to libtcod as is, so it has to be the C object
+        generator = tcod.random.Random(seed=mrogue.session.rng().getrandbits(31))
+        bsp.split_recursive(4, 11, 8, 1.0, 1.0, generator.random_c)
 
         # vector will collect node centers from childless nodes (rooms)
         vector = []
@@ -193,7 +259,9 @@ class Level:
 
         # place rooms
         for node_center in vector:
-            w, h = random.randint(3, 5), random.randint(2, 3)
+            w, h = mrogue.session.rng().randint(3, 5), mrogue.session.rng().randint(
+                2, 3
+            )
             left, top = max(node_center.x - w, 1), max(node_center.y - h, 2)
             right = min(node_center.x + w + 1, self.mapDim.x - 1)
             bottom = min(node_center.y + h + 1, self.mapDim.y - 1)
@@ -201,8 +269,8 @@ class Level:
         floor = np.argwhere(self.tiles["walkable"])
 
         # place stairs before digging tunnels
-        self.stairs_up_pos = Point(*random.choice(floor))
-        self.stairs_down_pos = Point(*random.choice(floor))
+        self.stairs_up_pos = Point(*mrogue.session.rng().choice(floor))
+        self.stairs_down_pos = Point(*mrogue.session.rng().choice(floor))
 
         # dig tunnels from opposite nodes to partition line center
         for node in bsp.inverted_level_order():
@@ -242,10 +310,12 @@ class Level:
     def tunnel(self, x1: int, y1: int, x2: int, y2: int) -> None:
         dx = 0 if x1 == x2 else int(abs(x2 - x1) / (x2 - x1))
         dy = 0 if y1 == y2 else int(abs(y2 - y1) / (y2 - y1))
-        horizontal = random.random() > 0.5
+        horizontal = mrogue.session.rng().random() > 0.5
         distance = 0
         broken = 100
-        self.tiles[x1, y1] = tiles["floor"]
+        # raw records, comparing structured values is slow for a cell at a time
+        wall, floor = compare["wall"].tobytes(), compare["floor"]
+        self.tiles[x1, y1] = floor
         while x1 != x2 or y1 != y2:
             if y1 == y2 or (horizontal and x1 != x2):
                 x1 += dx
@@ -253,74 +323,123 @@ class Level:
                 y1 += dy
             distance += 1
             # turn only after leaving the initial room
-            if self.tiles[x1, y1] == compare["wall"]:
+            if self.tiles[x1, y1].tobytes() == wall:
                 broken = distance
-            self.tiles[x1, y1] = tiles["floor"]
+            self.tiles[x1, y1] = floor
             # don't turn right away
-            if random.random() > 0.7 and distance - broken > 1:
+            if mrogue.session.rng().random() > 0.7 and distance - broken > 1:
                 horizontal = not horizontal
-        self.tiles[x2, y2] = tiles["floor"]
+        self.tiles[x2, y2] = floor
 
 
 class Dungeon:
-    _levels = []
-    _depth = 0
-    current_level: Level
+    _levels = SessionAttribute("levels")
+    _depth = SessionAttribute("depth")
+    current_level = SessionAttribute("current_level")
     mapTop = 1
-    mapDim = None
+    mapDim = SessionAttribute("map_dimensions")
 
-    def __init__(self):
+    def __init__(self, num_objects: int):
         self.screen = mrogue.io.Screen.get()
-        Dungeon.mapDim = Point(self.screen.width, self.screen.height - 1)
-        Dungeon.current_level = Level(Dungeon.mapDim)
-        Dungeon.current_level.create_level(first=True)
+        session = mrogue.session.current()
+        session.map_dimensions = Point(self.screen.width, self.screen.height - 1)
+        session.dungeon_seed = mrogue.session.rng().getrandbits(64)
+        session.current_level = Dungeon.generate(0, num_objects)
         Dungeon._levels.append(Dungeon.current_level)
 
     def new_level(self, num_objects: int) -> None:
         Dungeon.current_level.pos = mrogue.player.Player.get().pos
-        Dungeon.current_level = Level(self.mapDim)
-        Dungeon.current_level.create_level()
-        mrogue.item.manager.ItemManager.create_loot(
-            num_objects
-        )  # , Dungeon._depth // 4)
-        mrogue.monster.MonsterManager.create_monsters(num_objects, Dungeon._depth)
+        mrogue.session.current().current_level = Dungeon.generate(
+            Dungeon._depth, num_objects
+        )
         Dungeon._levels.append(Dungeon.current_level)
 
-    def level_from_string(self, level_string: str) -> Level:
-        level = Level(self.mapDim)
+    @classmethod
+    def generate(cls, depth: int, num_objects: int) -> Level:
+        # the layout, loot and monsters of a Level draw from random streams of its own,
+        # seeded from the dungeon's seed, so that the Level can be made again
+        session = mrogue.session.current()
+        origin = (depth, num_objects, session.serials)
+        outside = session.random
+        session.random = random.Random(cls.stream(depth, "layout"))
+        if depth == 8:
+            # the final Level is a preset one
+            with open(path.join(mrogue.work_dir, "data", "level8.dat"), "rb") as f:
+                level = cls.level_from_string(str(zlib.decompress(f.read()), "utf-8"))
+            level.pos = Point(48, 35)
+            level.set_tile(Point(48, 35), tiles["stairs_up"])
+        else:
+            level = Level(cls.mapDim)
+            level.create_level(first=depth == 0)
+        level.origin = origin
+        session.current_level = level
+        if depth != 8:
+            session.random = random.Random(cls.stream(depth, "loot"))
+            mrogue.item.manager.ItemManager.create_loot(num_objects)  # , depth // 4)
+        session.random = random.Random(cls.stream(depth, "monsters"))
+        mrogue.monster.MonsterManager.create_monsters(num_objects, depth)
+        session.random = outside
+        return level
+
+    @classmethod
+    def regenerate(cls, level: Level) -> Level:
+        # a new copy of a Level as it was generated; the game, including its Entity
+        # serials and state hash, is left as it is
+        assert level.origin is not None
+        depth, num_objects, serials = level.origin
+        session = mrogue.session.current()
+        kept = (
+            session.depth,
+            session.current_level,
+            session.serials,
+            session.running_hash,
+        )
+        session.depth, session.serials = depth, serials
+        try:
+            return cls.generate(depth, num_objects)
+        finally:
+            (
+                session.depth,
+                session.current_level,
+                session.serials,
+                session.running_hash,
+            ) = kept
+
+    @classmethod
+    def stream(cls, depth: int, name: str) -> str:
+        # seeds random for one part of generating a Level
+        return f"{mrogue.session.current().dungeon_seed}:{depth}:{name}"
+
+    @classmethod
+    def level_from_string(cls, level_string: str) -> Level:
+        level = Level(cls.mapDim)
         level_array = level_string.split()
         i = 0
-        while i < self.mapDim.y:
+        while i < cls.mapDim.y:
             level.tiles[:, i] = [ch for ch in level_array[i]]
             i += 1
+        level.hash_layout()
         return level
 
     def descend(self, pos: Point, num_objects: int) -> bool:
         if Dungeon.current_level.tiles[pos] == compare["stairs_down"]:
-            Dungeon._depth += 1
+            session = mrogue.session.current()
+            session.depth += 1
             mrogue.monster.MonsterManager.stop_monsters()
             # if next level exists already
             if Dungeon._depth < len(Dungeon._levels):
-                Dungeon.current_level = Dungeon._levels[Dungeon._depth]
+                Dungeon.enter(Dungeon._depth)
             # otherwise create a new one, use preset if it would be the final one
             else:
                 if Dungeon._depth == 8:
-                    import zlib
-
-                    with open(
-                        path.join(mrogue.work_dir, "data", "level8.dat"), "rb"
-                    ) as f:
-                        level_string = str(zlib.decompress(f.read()), "utf-8")
-                    Dungeon.current_level = self.level_from_string(level_string)
-                    Dungeon.current_level.pos = Point(48, 35)
-                    Dungeon.current_level.tiles[48, 35] = tiles["stairs_up"]
-                    mrogue.monster.MonsterManager.create_monsters(
-                        num_objects, Dungeon._depth
+                    session.current_level = Dungeon.generate(
+                        Dungeon._depth, num_objects
                     )
                     Dungeon._levels.append(Dungeon.current_level)
                 else:
                     self.new_level(num_objects)
             mrogue.player.Player.get().change_level(Dungeon.current_level)
+            Dungeon.arrived()
             return True
         mrogue.message.Messenger.add("There are no downward stairs here.")
         return False
@@ -332,20 +451,40 @@ class Dungeon:
     @classmethod
     def ascend(cls, pos: Point) -> bool:
         if cls.current_level.tiles[pos] == compare["stairs_up"]:
-            cls._depth -= 1
+            session = mrogue.session.current()
+            session.depth -= 1
             mrogue.monster.MonsterManager.stop_monsters()
-            cls.current_level = cls._levels[cls._depth]
+            cls.enter(cls._depth)
             mrogue.player.Player.get().change_level(cls.current_level)
+            cls.arrived()
             return True
         mrogue.message.Messenger.add("There are no upward stairs here.")
         return False
 
+    @classmethod
+    def enter(cls, depth: int) -> None:
+        # make a visited Level the current one, paging it back in if it's on disk
+        session = mrogue.session.current()
+        if session.level_store is not None:
+            session.level_store.page_in(session, depth)
+        session.current_level = cls._levels[depth]
+
+    @classmethod
+    def arrived(cls) -> None:
+        # the player is on another Level now, which may leave one too many in memory
+        session = mrogue.session.current()
+        if session.level_store is not None:
+            session.level_store.visit(session)
+
     @classmethod
     def find_spot(cls) -> Point:
-        free_spots = list(
-            filter(lambda spot: not cls.unit_at(Point(*spot)), cls.current_level.floor)
-        )
-        return Point(*random.choice(free_spots))
+        floor = cls.current_level.floor
+        height = cls.current_level.mapDim[1]
+        occupied = [
+            x * height + y for x, y in (u.pos for u in cls.current_level.entities.units)
+        ]
+        free_spots = floor[~np.isin(floor[:, 0] * height + floor[:, 1], occupied)]
+        return Point(*mrogue.session.rng().choice(free_spots))
 
     @classmethod
     def movement(cls, unit: mrogue.unit.Unit, check: Point) -> bool:
@@ -374,10 +513,10 @@ class Dungeon:
             unit.move()
             return True
 
-    def automove(
+    async def automove(
         self,
         pos: Point,
-        direction: int,
+        direction: Point,
         render_func: Callable,
         update_func: Callable,
     ) -> bool:
@@ -402,22 +541,18 @@ class Dungeon:
                 new_geometry = get_front(current_pos, delta_pos)
                 if not np.array_equal(geometry, new_geometry):
                     return True
-            for unit in Dungeon.current_level.units:
+            for unit in Dungeon.current_level.entities.units:
                 if not unit.player and mrogue.utils.adjacent(current_pos, unit.pos, 3):
                     return True
-            for obj in Dungeon.current_level.objects_on_map:
-                if issubclass(
-                    type(obj), mrogue.item.item.Item
-                ) and mrogue.utils.adjacent(current_pos, obj.pos):
+            for obj in Dungeon.current_level.entities.items:
+                if mrogue.utils.adjacent(current_pos, obj.pos):
                     return True
             return False
 
-        placement = np.nonzero(mrogue.io.directions == direction)
-        if placement[1] == 1 and placement[2] == 1:
+        dx, dy = direction
+        if not dx and not dy:
             # to avoid an infinite loop. Perhaps do it in main loop
             return False
-        dx = placement[2][0] - 1
-        dy = placement[1][0] - 1
         if scan(pos, Point(0, 0)):  # delta unused in this case
             # attempt normal movement if there are enemies or items in range
             return self.movement(
@@ -430,10 +565,10 @@ class Dungeon:
                 # if the layout changes or there are Entities, stop automatic movement
                 break
             # stop movement if Player dies
-            if update_func():
+            if await update_func():
                 break
             # update the dungeon state every step
-            render_func()
+            await render_func()
             mrogue.message.Messenger.clear()
             pos = Point(pos.x + dx, pos.y + dy)
             if not Dungeon.current_level.tiles[pos]["walkable"]:
@@ -451,55 +586,39 @@ class Dungeon:
 
     @classmethod
     def unit_at(cls, where: Point) -> mrogue.unit.Unit or None:
-        for unit in cls.current_level.units:
+        for unit in cls.current_level.entities.units:
             if unit.pos == where:
                 return unit
         return None
 
-    def draw_map(self):
-        nothing = np.asarray(
-            (0, (0, 0, 0, 0), (0, 0, 0, 0)), dtype=tcod.console.rgba_graphic
-        )
-        item_heap = (0x25, (*tcod.gray, 255), (*tcod.blue * 0.3, 255))
+    def draw_map(self) -> None:
         self.screen.clear()
         player = mrogue.player.Player.get()
         level = Dungeon.current_level
-        display_items = list(
-            filter(
-                lambda item: isinstance(item, mrogue.item.item.Item),
-                level.objects_on_map,
-            )
-        )
-        display_monsters = list(
-            filter(
-                lambda m: isinstance(m, mrogue.monster.Monster), level.objects_on_map
-            )
-        )
-        if "debug" in argv:
+        fov = None if "debug" in argv else player.fov
+        if fov is None:
             self.screen.rgba[:, 0:39] = level.tiles["lit"]
         else:
-            # TODO: investigate the bug below
-            display_items = list(
-                filter(lambda item: item.pos and player.fov[item.pos], display_items)
-            )
-            display_monsters = list(
-                filter(lambda m: player.fov[m.pos], display_monsters)
-            )
             self.screen.rgba[:, 0:39] = np.select(
-                (player.fov, level.explored),
+                (fov, level.explored),
                 (level.tiles["lit"], level.tiles["dim"]),
                 nothing,
             )
-        items_dict = defaultdict(list)
-        for i in display_items:
-            items_dict[i.pos].append(i)
-        for pos, item_list in items_dict.items():
-            self.screen.rgba[pos] = (
-                item_list[0].tile if len(item_list) == 1 else item_heap
-            )
-        for monster in display_monsters:
-            self.screen.rgba[monster.pos] = monster.tile
-        self.screen.rgba[player.pos] = player.tile
+        rgba = self.screen.rgba
+        # items: a lone item shows its own icon, several at one spot are shown as a heap
+        (xs, ys), graphics = gather(level.entities.items, fov)
+        _, first, counts = np.unique(
+            np.ravel_multi_index((xs, ys), level.mapDim),
+            return_index=True,
+            return_counts=True,
+        )
+        single, heap = first[counts == 1], first[counts > 1]
+        rgba[xs[single], ys[single]] = graphics[single]
+        rgba[xs[heap], ys[heap]] = item_heap
+        # units, then the player on top of everything else
+        (xs, ys), graphics = gather(level.entities.units, fov)
+        rgba[xs, ys] = graphics
+        rgba[player.pos] = player.graphic
 
     @classmethod
     def neighbors(cls, of: Point) -> list[Point]:
@@ -4,22 +4,30 @@ from textwrap import wrap
 import tcod.console
 
 import mrogue.io
+import mrogue.session
+from mrogue.session import SessionAttribute
 
 
 class Messenger:
-    _message_list = []
-    message_history = []
-    window = None
+    _message_list = SessionAttribute("messages")
+    message_history = SessionAttribute("message_history")
+    window = SessionAttribute("message_window")
 
     def __init__(self):
         self.screen = mrogue.io.Screen.get()
-        Messenger.window = tcod.console.Console(self.screen.width, 1)
+        mrogue.session.current().message_window = tcod.console.Console(
+            self.screen.width, 1
+        )
 
-    def show(self) -> None:
+    async def show(self) -> None:
+        if "messages" not in mrogue.io.Screen.dirty:
+            Messenger.window.blit(self.screen, 0, self.screen.height - 1)
+            return
         whole_message = " ".join(self._message_list)
         if whole_message:
-            self.message_history += wrap(whole_message, 63)
+            self.message_history.extend(wrap(whole_message, 63))
         buffer = wrap(whole_message, self.screen.width - 7)
+        Messenger.window.clear()
         while buffer:
             line = buffer.pop(0)
             Messenger.window.clear()
@@ -30,43 +38,36 @@ class Messenger:
                 )
                 Messenger.window.blit(self.screen, 0, self.screen.height - 1)
                 self.screen.present()
-                mrogue.io.wait(tcod.event.K_SPACE)
-            else:
-                Messenger.window.blit(self.screen, 0, self.screen.height - 1)
+                await mrogue.io.wait(tcod.event.K_SPACE)
+        Messenger.window.blit(self.screen, 0, self.screen.height - 1)
 
     @classmethod
     def add(cls, message: str) -> None:
         cls._message_list.append(message)
+        mrogue.io.Screen.invalidate("messages")
 
     @classmethod
     def clear(cls) -> None:
+        if cls._message_list:
+            mrogue.io.Screen.invalidate("messages")
         del cls._message_list[:]
         cls.window.clear()
 
-    def message_screen(self) -> None:
-        window = tcod.Console(65, 12, "F")
-        scroll = len(self.message_history) - 10 if len(self.message_history) > 10 else 0
+    async def message_screen(self) -> None:
+        history = mrogue.io.ListView(self.message_history, 10, hotkeys=False)
+        # start at the most recent messages
+        history.scroll = max(0, len(history) - history.height)
+        window = mrogue.io.window("messages", 65, 12)
         while True:
             window.clear()
             window.draw_frame(0, 0, 65, 12, "Messages")
-            if scroll > 0:
-                window.print(
-                    0, 1, chr(0x2191), mrogue.io.Color.black, mrogue.io.Color.white
-                )
-            for i in range(len(self.message_history)):
-                if i > 10 - 1:
-                    break
-                window.print(1, 1 + i, self.message_history[i + scroll])
-            if 10 + scroll < len(self.message_history):
-                window.print(
-                    0, 10, chr(0x2193), mrogue.io.Color.black, mrogue.io.Color.white
-                )
+            history.draw(
+                window, 0, 1, lambda console, x, y, line: console.print(x, y, line)
+            )
             window.blit(self.screen, 12, 12, bg_alpha=0.95)
             self.screen.present()
-            key = mrogue.io.wait()
+            key = await mrogue.io.wait()
+            if history.handle(key):
+                continue
             if mrogue.io.key_is(key, tcod.event.K_ESCAPE):
                 return
-            elif mrogue.io.key_is(key, tcod.event.K_DOWN):
-                scroll += 1 if 10 + scroll < len(self.message_history) else 0
-            elif mrogue.io.key_is(key, tcod.event.K_UP):
-                scroll -= 1 if scroll > 0 else 0
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from typing import Any, Hashable, NamedTuple
+
+import mrogue
+
+operations = ("set", "add", "mul")
+
+
+class Modifier(NamedTuple):
+    stat: str
+    value: Any
+    # "set" replaces the base value, then all "add" are summed, then all "mul" multiplied
+    operation: str = "add"
+
+
+class Stats:
+    # derived statistics built from base values and modifiers registered by sources
+    # (equipped items, timed buffs, carried load...); a stat is recomputed on first
+    # read after one of the sources contributing to it has changed
+    def __init__(self, **base: Any) -> None:
+        self._base = base
+        self._sources: dict[Hashable, tuple[Modifier, ...]] = {}
+        self._contributors: dict[str, dict[Hashable, None]] = {s: {} for s in base}
+        self._values: dict[str, Any] = {}
+
+    def __getitem__(self, stat: str) -> Any:
+        try:
+            return self._values[stat]
+        except KeyError:
+            value = self._values[stat] = self._compute(stat)
+            return value
+
+    def __contains__(self, source: Hashable) -> bool:
+        return source in self._sources
+
+    def fork(self, memo: dict[int, Any]) -> Stats:
+        # sources are looked up in the fork, Modifiers themselves are immutable
+        clone = memo[id(self)] = Stats.__new__(Stats)
+        clone._base = dict(self._base)
+        clone._sources = {
+            mrogue.forked(source, memo): modifiers
+            for source, modifiers in self._sources.items()
+        }
+        clone._contributors = {
+            stat: {mrogue.forked(source, memo): None for source in sources}
+            for stat, sources in self._contributors.items()
+        }
+        clone._values = dict(self._values)
+        return clone
+
+    def _dirty(self, source: Hashable) -> None:
+        for modifier in self._sources.get(source, ()):
+            self._contributors[modifier.stat][source] = None
+            self._values.pop(modifier.stat, None)
+
+    def set(self, source: Hashable, *modifiers: Modifier) -> None:
+        # replace all modifiers registered by the source
+        self.clear(source)
+        for modifier in modifiers:
+            if modifier.operation not in operations:
+                raise ValueError(f"Unknown modifier operation: {modifier.operation}")
+        if modifiers:
+            self._sources[source] = modifiers
+            self._dirty(source)
+
+    def clear(self, source: Hashable) -> None:
+        for modifier in self._sources.pop(source, ()):
+            self._contributors[modifier.stat].pop(source, None)
+            self._values.pop(modifier.stat, None)
+
+    def rebase(self, stat: str, value: Any) -> None:
+        self._base[stat] = value
+        self._values.pop(stat, None)
+
+    def _compute(self, stat: str) -> Any:
+        modifiers = [
+            m
+            for source in self._contributors[stat]
+            for m in self._sources[source]
+            if m.stat == stat
+        ]
+        value = self._base[stat]
+        for modifier in modifiers:
+            if modifier.operation == "set":
+                value = modifier.value
+        for modifier in modifiers:
+            if modifier.operation == "add":
+                value += modifier.value
+        for modifier in modifiers:
+            if modifier.operation == "mul":
+                value *= modifier.value
+        return value
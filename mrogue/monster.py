@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-import random
+from typing import Any
 
 import tcod
 
@@ -7,13 +7,15 @@ import mrogue.item.manager
 import mrogue.map
 import mrogue.monster_data
 import mrogue.player
+import mrogue.session
 import mrogue.unit
 import mrogue.utils
 from mrogue import Point
+from mrogue.session import SessionAttribute
 
 
 class Monster(mrogue.unit.Unit):
-    def __init__(self, template, groups):
+    def __init__(self, template, registry):
         super().__init__(
             template["name"],
             (template["icon"], template["color"]),
@@ -28,16 +30,22 @@ class Monster(mrogue.unit.Unit):
         )
         self.background = (76, 0, 0)
         self.path = None
-        if "weapon" in template and random.randint(0, 1):
+        if "weapon" in template and mrogue.session.rng().randint(0, 1):
             mrogue.item.manager.ItemManager.random_item(
                 template["weapon"], self.inventory
             )
-        for group in groups:
-            group.append(self)
+        self.add(registry)
 
     def __repr__(self):
         return f"Monster('{self.name}', 0x{self.icon:x})"  # ", {self.color})"
 
+    def fork(self, memo: dict[int, Any]) -> "Monster":
+        clone = super().fork(memo)
+        assert isinstance(clone, Monster)
+        if self.path:
+            clone.path = list(self.path)
+        return clone
+
     def act(self, target: mrogue.unit.Unit) -> None:
         if mrogue.utils.adjacent(self.pos, target.pos):
             self.path = None
@@ -57,7 +65,7 @@ class Monster(mrogue.unit.Unit):
             ):
                 self.approach(target.pos)
             else:
-                if random.random() > 0.5:
+                if mrogue.session.rng().random() > 0.5:
                     self.wander()
 
     def is_in_range(self, target_position: Point) -> bool:
@@ -96,45 +104,48 @@ class Monster(mrogue.unit.Unit):
                 if pairs:
                     to = min(pairs, key=lambda v: v[0] * v[0] + v[1] * v[1])[2]
             else:
-                to = random.choice(free_spots)
+                to = mrogue.session.rng().choice(free_spots)
             mrogue.map.Dungeon.movement(self, to)
 
 
 class MonsterManager:
-    order = None
-    acting_initiative = 0
-    selection_for_level = []
-
-    def __init__(self):
-        for i in range(8 + 1):
-            this_level = []
-            for group, data in mrogue.monster_data.templates.items():
-                if i in data["occurrences"].keys():
-                    this_level.append(group)
-            self.selection_for_level.append(this_level)
+    order = SessionAttribute("turn_order")
+    acting_initiative = SessionAttribute("acting_initiative")
+    selection_for_level: dict[int, list[str]] = {}
+
+    @classmethod
+    def selection(cls, depth: int) -> list[str]:
+        # built on first use, as most depths are never reached in a session
+        if depth not in cls.selection_for_level:
+            cls.selection_for_level[depth] = [
+                group
+                for group, data in mrogue.monster_data.templates.items()
+                if depth in data["occurrences"].keys()
+            ]
+        return cls.selection_for_level[depth]
 
     @classmethod
     def create_monsters(cls, num: int, depth: int) -> None:
         level = mrogue.map.Dungeon.current_level
         for i in range(num + depth):
-            group = random.choice(cls.selection_for_level[depth])
-            template = random.choices(
+            group = mrogue.session.rng().choice(cls.selection(depth))
+            template = mrogue.session.rng().choices(
                 mrogue.monster_data.templates[group]["subtypes"],
                 mrogue.monster_data.templates[group]["occurrences"][depth],
             )[0]
-            Monster(template, (level.objects_on_map, level.units))
+            Monster(template, level.entities)
 
     @classmethod
     def spawn_monster(cls, depth: int, **kwargs) -> None:
         level = mrogue.map.Dungeon.current_level
-        group = random.choice(cls.selection_for_level[depth])
-        template = random.choices(
+        group = mrogue.session.rng().choice(cls.selection(depth))
+        template = mrogue.session.rng().choices(
             mrogue.monster_data.templates[group]["subtypes"],
             mrogue.monster_data.templates[group]["occurrences"][depth],
         )[0]
-        m = Monster(template, (level.objects_on_map, level.units))
+        m = Monster(template, level.entities)
         while True:
-            pos = Point(*random.choice(level.floor))
+            pos = Point(*mrogue.session.rng().choice(level.floor))
             if not mrogue.player.Player.get().fov[pos]:
                 break
         setattr(m, "pos", pos)
@@ -145,14 +156,16 @@ class MonsterManager:
     @classmethod
     def handle_monsters(cls, target: mrogue.unit.Unit) -> None:
         player = mrogue.player.Player.get()
+        session = mrogue.session.current()
         while True:
             if cls.order:
                 for unit in cls.order:
                     unit.initiative -= cls.acting_initiative
-            cls.order = sorted(
-                mrogue.map.Dungeon.current_level.units, key=lambda m: m.initiative
+            session.turn_order = sorted(
+                mrogue.map.Dungeon.current_level.entities.units,
+                key=lambda m: m.initiative,
             )
-            cls.acting_initiative = cls.order[0].initiative
+            session.acting_initiative = cls.order[0].initiative
             while cls.order[0].initiative == cls.acting_initiative:
                 unit = cls.order.pop(0)
                 unit.update()
@@ -163,7 +176,7 @@ class MonsterManager:
 
     @classmethod
     def stop_monsters(cls) -> None:
-        for monster in mrogue.map.Dungeon.current_level.units:
+        for monster in mrogue.map.Dungeon.current_level.entities.units:
             if hasattr(monster, "path"):
                 monster.path = None
         cls.order.clear()
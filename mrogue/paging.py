@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+import mmap
+import pickle
+import tempfile
+import zlib
+from typing import Any, Callable
+
+import numpy as np
+
+import mrogue
+import mrogue.io
+import mrogue.map
+import mrogue.save
+import mrogue.session
+
+# inactive Levels kept in memory, the ones visited last; the others wait on disk
+resident_levels = 2
+
+
+def journal(
+    session: mrogue.session.GameSession,
+    index: int,
+    found: dict[int, mrogue.save.Reference],
+) -> bytes:
+    # what the player changed on a generated Level: the Entities there now, in order,
+    # those changed or brought in since it was generated, the explored cells, and the
+    # layout if it changed; Entities are referred to by their serials
+    level = session.levels[index]
+    baseline = mrogue.map.Dungeon.regenerate(level)
+    found = dict(found)
+    for each in (level, baseline):
+        found[id(each.entities)] = ("registry", index)
+        for entity in each.entities:
+            if entity is not session.player:
+                found[id(entity)] = ("serial", entity.serial)
+    generated = {
+        entity.serial: mrogue.save.dumps(entity.__getstate__(), found)[0]
+        for entity in baseline.entities
+    }
+    states, kinds = {}, {}
+    for entity in level.entities:
+        if entity is session.player:
+            continue
+        state = mrogue.save.dumps(entity.__getstate__(), found)[0]
+        if generated.get(entity.serial) != state:
+            states[entity.serial] = state
+        if entity.serial not in generated:
+            kinds[entity.serial] = entity.__class__
+    attributes = {}
+    for name, value in level.__dict__.items():
+        if name in mrogue.save.level_arrays or name == "entities":
+            continue
+        pickled = mrogue.save.dumps(value, found)[0]
+        if pickled != mrogue.save.dumps(baseline.__dict__.get(name), found)[0]:
+            attributes[name] = pickled
+    changes = {
+        "order": [entity.serial for entity in level.entities],
+        "states": states,
+        "kinds": kinds,
+        "attributes": attributes,
+        "explored": np.packbits(level.explored.ravel(order="F")).tobytes(),
+        "tiles": None,
+    }
+    if level.layout_hash != baseline.layout_hash:
+        changes["tiles"] = level.tiles.tobytes(order="F")
+    return zlib.compress(pickle.dumps(changes, pickle.HIGHEST_PROTOCOL))
+
+
+def replay(
+    session: mrogue.session.GameSession, index: int, changes: bytes
+) -> mrogue.map.Level:
+    # the Level generated anew, with the journal of the player's changes applied
+    level = mrogue.map.Dungeon.regenerate(session.levels[index])
+    player = session.player
+    assert player is not None
+    recorded = pickle.loads(zlib.decompress(changes))
+    entities = {entity.serial: entity for entity in level.entities}
+    for serial, kind in recorded["kinds"].items():
+        entities[serial] = object.__new__(kind)
+    loaded: dict[mrogue.save.Reference, Any] = {("player",): player}
+    for other, each in enumerate(session.levels):
+        loaded["registry", other] = each.entities
+    loaded["registry", index] = level.entities
+
+    def find(reference: mrogue.save.Reference) -> Any:
+        if reference[0] == "serial":
+            return entities[reference[1]]
+        return loaded[reference]
+
+    def load(pickled: bytes) -> Any:
+        unpickler = pickle.Unpickler(io.BytesIO(pickled))
+        unpickler.persistent_load = find  # type: ignore[method-assign]
+        return unpickler.load()
+
+    for serial, state in recorded["states"].items():
+        entity = entities[serial]
+        entity.__dict__.clear()
+        entity.__dict__.update(load(state))
+    # Entities killed or taken away are left out
+    registry = level.entities
+    registry.__init__(registry.serial)  # type: ignore[misc]
+    for serial in recorded["order"]:
+        registry.add(player if serial == player.serial else entities[serial])
+    for name, value in recorded["attributes"].items():
+        level.__dict__[name] = load(value)
+    size = level.mapDim[0] * level.mapDim[1]
+    explored = np.unpackbits(np.frombuffer(recorded["explored"], np.uint8), count=size)
+    level.explored = explored.astype(bool).reshape(level.mapDim, order="F")
+    if recorded["tiles"] is not None:
+        tiles = np.frombuffer(recorded["tiles"], mrogue.io.tile_dt)
+        level.tiles = tiles.reshape(level.mapDim, order="F").copy(order="F")
+    return level
+
+
+class LevelStore:
+    # Levels paged out of memory; their Level objects and EntityRegistries stay in the
+    # game as empty shells (see Level.paged). Generated Levels are kept as journals of
+    # what the player changed and made again when needed, the others are packed as in a
+    # save, in a temporary file read through a memory map
+    def __init__(self, resident: int = resident_levels) -> None:
+        self.resident = resident
+        self.file = tempfile.TemporaryFile()
+        self.size = 0
+        # (offset, length) of every Level paged out to the file, by depth
+        self.chunks: dict[int, tuple[int, int]] = {}
+        # bytes of the file left behind by Levels paged in again
+        self.unused = 0
+        # compressed journals of generated Levels, by depth
+        self.journals: dict[int, bytes] = {}
+        # depths of the Levels in memory, the one visited last at the end
+        self.recent: list[int] = []
+        # called with a Level about to be paged out, e.g. to save it first
+        self.paging_out: list[Callable[[mrogue.session.GameSession, int], None]] = []
+
+    def fork(self) -> LevelStore:
+        clone = LevelStore(self.resident)
+        for index in self.chunks:
+            clone._append(index, self._read(index))
+        clone.journals = dict(self.journals)
+        clone.recent = list(self.recent)
+        return clone
+
+    def chunk(self, session: mrogue.session.GameSession, index: int) -> bytes:
+        # a paged out Level as saved
+        if index not in self.journals:
+            return self._read(index)
+        level = replay(session, index, self.journals[index])
+        found = mrogue.save.references(session)
+        found[id(level.entities)] = ("registry", index)
+        snapshot = mrogue.save.snapshot_level(level, index, found)[0]
+        return mrogue.save.pack_level(snapshot)
+
+    def visit(self, session: mrogue.session.GameSession) -> None:
+        # after the player came to another Level; the inactive Levels visited longest ago
+        # beyond the resident ones are paged out
+        self.recent = [index for index in self.recent if index != session.depth]
+        self.recent.append(session.depth)
+        idle = [
+            index
+            for index, level in enumerate(session.levels)
+            if not level.paged and index not in self.recent
+        ]
+        idle.extend(self.recent[:-1])
+        for index in idle[: max(0, len(idle) - self.resident)]:
+            if self.page_out(session, index) and index in self.recent:
+                self.recent.remove(index)
+
+    def page_in(self, session: mrogue.session.GameSession, index: int) -> None:
+        level = session.levels[index]
+        if not level.paged:
+            return
+        player = session.player
+        if index in self.journals:
+            restored = replay(session, index, self.journals.pop(index))
+            # the Entities join the registry the game refers to instead of the new one
+            registry = restored.entities
+            level.entities.__dict__.update(registry.__dict__)
+            for entity in level.entities:
+                if entity is not player:
+                    del entity._groups[registry]
+                    entity._groups[level.entities] = None
+            restored.entities = level.entities
+            level.__dict__ = restored.__dict__
+        else:
+            loaded: dict[mrogue.save.Reference, Any] = {("player",): player}
+            for other, each in enumerate(session.levels):
+                loaded["registry", other] = each.entities
+            restored = mrogue.save.load_level(self._read(index), index, loaded)
+            level.__dict__ = restored.__dict__
+            self.unused += self.chunks.pop(index)[1]
+            if not self.chunks:
+                self.file.truncate(0)
+                self.size = self.unused = 0
+        # in a fork of the game the player joins the shell of the registry only now
+        if player is not None and player in level.entities:
+            player._groups[level.entities] = None
+
+    def page_out(self, session: mrogue.session.GameSession, index: int) -> bool:
+        # returns False if the Level has to stay, as the rest of the game refers to its
+        # Entities; the Entities of a Level never refer to those of another one
+        level = session.levels[index]
+        found = mrogue.save.references(session)
+        snapshot, referenced = mrogue.save.snapshot_level(level, index, found)
+        if any(reference[0] == "entity" for reference in referenced):
+            return False
+        referenced = mrogue.save.dumps(mrogue.save.game_state(session), found)[1]
+        if any(reference[:2] == ("entity", index) for reference in referenced):
+            return False
+        for call in self.paging_out:
+            call(session, index)
+        if level.origin is not None:
+            self.journals[index] = journal(session, index, found)
+        else:
+            self._append(index, mrogue.save.pack_level(snapshot))
+        level.entities.__dict__.clear()
+        level.__dict__ = {"entities": level.entities, "origin": level.origin}
+        if self.unused > self.size // 2:
+            self._compact()
+        return True
+
+    def _read(self, index: int) -> bytes:
+        offset, length = self.chunks[index]
+        with mmap.mmap(self.file.fileno(), self.size, access=mmap.ACCESS_READ) as view:
+            return view[offset : offset + length]
+
+    def _append(self, index: int, chunk: bytes) -> None:
+        self.file.seek(self.size)
+        self.file.write(chunk)
+        self.file.flush()
+        self.chunks[index] = (self.size, len(chunk))
+        self.size += len(chunk)
+
+    def _compact(self) -> None:
+        chunks = {index: self._read(index) for index in self.chunks}
+        self.file.truncate(0)
+        self.size = self.unused = 0
+        for index, chunk in chunks.items():
+            self._append(index, chunk)
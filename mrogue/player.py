@@ -9,10 +9,13 @@ from tcod.path import Dijkstra
 
 import mrogue.item
 import mrogue.monster
+import mrogue.session
 import mrogue.timers
 import mrogue.unit
 import mrogue.utils
 from mrogue.io import Color
+from mrogue.modifiers import Modifier
+from mrogue.session import SessionAttribute
 
 if TYPE_CHECKING:
     from mrogue.item.item import Wearable
@@ -28,12 +31,13 @@ load_statuses = {
 
 
 class Player(mrogue.unit.Unit):
-    _instance = None
+    _instance = SessionAttribute("player")
 
     def __new__(cls, *args: Any, **kwargs: Any) -> Player:
-        if not cls._instance:
-            cls._instance = super(Player, cls).__new__(cls)
-        return cls._instance
+        session = mrogue.session.current()
+        if not session.player:
+            session.player = super(Player, cls).__new__(cls)
+        return session.player
 
     @classmethod
     def get(cls) -> Player:
@@ -45,26 +49,75 @@ class Player(mrogue.unit.Unit):
         )
         self.background = (0, 76, 0)
         self.player = True
-        self.dijkstra_map = Dijkstra(mrogue.map.Dungeon.current_level.tiles["walkable"])
-        self.dijkstra_map.set_goal(*self.pos)
+        self._dijkstra: Dijkstra | None = None
+        self._dijkstra_goal: mrogue.Point | None = None
         self.load_status = "light"
         self.load_thresholds = tuple(
             threshold + self.abilities["str"].mod for threshold in self.load_thresholds
         )
-        self.identified_consumables: list[str] = []
+        # effects of Consumables known to the player
+        self.identified_consumables: set[str] = set()
         self.health_regen_cooldown = 0
         self.crit_immunity = 0.0
         self.status_bar = tcod.console.Console(mrogue.io.Screen.get().width, 1, "F")
+        self._status_shown: tuple[Any, ...] | None = None
         self.add_item(mrogue.item.manager.ItemManager.blueprints["stick"].create())
         self.add_item(mrogue.item.manager.ItemManager.blueprints["tunic"].create())
         for freebie in list(self.inventory):
             self.equip(freebie, quiet=True)
-        self.add(
-            mrogue.map.Dungeon.current_level.objects_on_map,
-            mrogue.map.Dungeon.current_level.units,
-        )
+        self.add(mrogue.map.Dungeon.current_level.entities)
+
+    def fork(self, memo: dict[int, Any]) -> Player:
+        clone = super().fork(memo)
+        assert isinstance(clone, Player)
+        clone.identified_consumables = set(self.identified_consumables)
+        clone.status_bar = tcod.console.Console(self.status_bar.width, 1, "F")
+        clone._status_shown = None
+        # libtcod's pathfinding state can't be copied, the fork computes its own
+        clone._dijkstra = None
+        return clone
+
+    def __getstate__(self) -> dict[str, Any]:
+        # consoles and libtcod's pathfinding state are made anew after loading
+        state = super().__getstate__()
+        del state["status_bar"]
+        state["_status_shown"] = None
+        state["_dijkstra"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.status_bar = tcod.console.Console(mrogue.io.Screen.get().width, 1, "F")
+
+    @property
+    def dijkstra_map(self) -> Dijkstra:
+        # distances to the player, computed when a monster asks for a path
+        if self._dijkstra is None:
+            self._dijkstra = Dijkstra(
+                mrogue.map.Dungeon.current_level.tiles["walkable"]
+            )
+            self._dijkstra_goal = None
+        if self._dijkstra_goal != self.pos:
+            self._dijkstra.set_goal(*self.pos)
+            self._dijkstra_goal = self.pos
+        return self._dijkstra
 
     def show_stats(self) -> None:
+        shown = (
+            self.current_HP,
+            self.max_HP,
+            self.armor_class,
+            self.damage_dice,
+            self.to_hit,
+            self.load_status,
+            mrogue.map.Dungeon.depth(),
+        )
+        if shown != self._status_shown:
+            self._status_shown = shown
+            self._compose_status_bar()
+        self.status_bar.blit(mrogue.io.Screen.get())
+
+    def _compose_status_bar(self) -> None:
         self.status_bar.clear()
         self.status_bar.print(0, 0, "HP:")
         r, g, b = tcod.color_lerp(Color.red, Color.green, self.current_HP / self.max_HP)
@@ -78,7 +131,6 @@ class Player(mrogue.unit.Unit):
         )
         self.status_bar.print(47, 0, f"Depth: {mrogue.map.Dungeon.depth()}")
         self.status_bar.print(72, 0, "Press Q to quit, H for help.")
-        self.status_bar.blit(mrogue.io.Screen.get())
 
     def heal_callable(self):
         self.heal(1)
@@ -102,15 +154,16 @@ class Player(mrogue.unit.Unit):
                 mrogue.message.Messenger.add("You are overburdened!")
             else:
                 mrogue.message.Messenger.add("You shuffle in place.")
-        else:
-            self.dijkstra_map.set_goal(*self.pos)
 
     def change_level(self, level: Level) -> None:
         self.pos = level.pos
-        self.dijkstra_map = Dijkstra(level.tiles["walkable"])
-        self.dijkstra_map.set_goal(*self.pos)
-        if self not in level.units:
-            self.add(level.objects_on_map, level.units)
+        self._dijkstra = None
+        # the player is listed on the Level they are on only, those left may be paged out
+        for group in list(self._groups):
+            if isinstance(group, mrogue.EntityRegistry) and group is not level.entities:
+                self.remove(group)
+        if self not in level.entities:
+            self.add(level.entities)
 
     def update(self) -> None:
         self.regenerate_health()
@@ -133,7 +186,7 @@ class Player(mrogue.unit.Unit):
 
     def burden_update(self) -> None:
         super().burden_update()
-        total_load = sum([i.weight for i in self.inventory + self.equipped])
+        total_load = self.inventory.weight + self.equipped.weight
         if total_load < self.load_thresholds[0]:
             self.load_status = "light"
         elif total_load < self.load_thresholds[1]:
@@ -142,24 +195,29 @@ class Player(mrogue.unit.Unit):
             self.load_status = "heavy"
         else:
             self.load_status = "immobile"
-        self.speed = (
-            load_statuses[self.load_status][0] - self.abilities["dex"].mod / 100
-        ) * self.speed_bonus
+        self.stats.set(
+            "load",
+            Modifier(
+                "speed",
+                load_statuses[self.load_status][0] - self.abilities["dex"].mod / 100,
+                "set",
+            ),
+        )
 
-    def in_slot(self, slot: str):
-        return mrogue.utils.find_in(self.equipped, "slot", slot)
+    def in_slot(self, slot: str) -> Wearable | None:
+        return next(iter(self.equipped.in_slot(slot)), None)
 
-    def check_pulse(self, dungeon: Dungeon, messenger: Messenger) -> bool:
+    async def check_pulse(self, dungeon: Dungeon, messenger: Messenger) -> bool:
         if self.current_HP < 1 and "debug" not in sys.argv:
             window = tcod.Console(20, 4, "F")
             window.draw_frame(0, 0, 20, 4, "Game over.", False)
             window.print_box(0, 2, 20, 1, "YOU DIED", Color.red, alignment=tcod.CENTER)
             dungeon.draw_map()
             self.show_stats()
-            messenger.show()
+            await messenger.show()
             window.blit(mrogue.io.Screen.get(), 10, 10)
             mrogue.io.Screen.present()
-            mrogue.io.wait(tcod.event.K_ESCAPE)
+            await mrogue.io.wait(tcod.event.K_ESCAPE)
             return True
         return False
 
@@ -177,21 +235,16 @@ class Player(mrogue.unit.Unit):
             return True
         return False
 
-    def pickup(self, item_manager: mrogue.item.manager.ItemManager) -> bool:
+    async def pickup(self, item_manager: mrogue.item.manager.ItemManager) -> bool:
         item_list = item_manager.get_item_on_map(self.pos)
         if not item_list:
             msg = "There are no items here."
             mrogue.message.Messenger.add(msg)
             return False
         if len(item_list) > 1:
-            chosen = item_manager.show_pickup_choice(item_list)
+            chosen = await item_manager.show_pickup_choice(item_list)
             if not chosen:
                 return False
-            if type(chosen) == list:
-                for item in chosen:
-                    super().pickup_item([item])
-                return True
-            elif type(chosen) == mrogue.item.item.Item:
-                return super().pickup_item([chosen])
+            return self.pickup_items(chosen)
         else:
-            return super().pickup_item(item_list)
+            return self.pickup_item(item_list)
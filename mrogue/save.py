@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import copyreg
+import io
+import logging
+import os
+import pickle
+import queue
+import struct
+import threading
+import zlib
+from os import path
+from typing import Any, BinaryIO, NamedTuple
+
+import numpy as np
+
+import mrogue
+import mrogue.io
+import mrogue.map
+import mrogue.message
+import mrogue.player
+import mrogue.session
+
+default_file = path.join(mrogue.work_dir, "save.dat")
+# autosaves go to a file of their own, they must not overwrite what the player saved
+autosave_file = path.join(mrogue.work_dir, "autosave.dat")
+log = logging.getLogger(__name__)
+
+# a save starts with the header and a table of (offset, length) for its chunks:
+# the game state first, then one chunk for every Level with its arrays and Entities;
+# the rest is pickled, so only saves the player made themselves may be loaded
+magic = b"MROGUESV"
+version = 1
+header = struct.Struct("<8sHH")
+entry = struct.Struct("<QQ")
+# dimensions of a Level, the number of its floor cells (-1 if it has no floor list)
+# and the length of the pickled rest of the Level, which follows its arrays
+level_header = struct.Struct("<HHiI")
+level_arrays = ("tiles", "explored", "floor")
+# how objects saved in other chunks are referred to: ("player",), ("registry", level)
+# and ("entity", level, number among the Entities of the Level other than the player)
+Reference = tuple[Any, ...]
+# compression level, saves are written while playing and have to be quick
+compression = 1
+# turns between autosaves
+autosave_interval = 10
+
+# what a GameSession keeps besides its Levels and the player; the rest (display,
+# typeahead) belongs to whoever plays the game and is not saved
+session_fields = (
+    "depth",
+    "map_dimensions",
+    "dungeon_seed",
+    "messages",
+    "message_history",
+    "timers",
+    "turn_order",
+    "acting_initiative",
+    "scroll_names",
+    "potion_colors",
+    "serials",
+    "running_hash",
+)
+
+
+class Pickler(pickle.Pickler):
+    # objects saved in another chunk are pickled as references to it: the player and the
+    # Entities of other Levels; positions come from NumPy arrays, as plain ints they are
+    # saved and loaded twice as fast
+    dispatch_table = {
+        **copyreg.dispatch_table,
+        np.int64: lambda value: (int, (int(value),)),
+        mrogue.Point: lambda point: (mrogue.Point, tuple(map(int, point))),
+    }
+
+    def __init__(
+        self, file: BinaryIO, references: dict[int, Reference], level: int | None = None
+    ) -> None:
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.references = references
+        self.level = level
+        self.referenced: set[Reference] = set()
+
+    def persistent_id(self, obj: Any) -> Reference | None:
+        reference = self.references.get(id(obj))
+        if reference is None or reference[0] == "entity" and reference[1] == self.level:
+            return None
+        self.referenced.add(reference)
+        return reference
+
+
+class Level(NamedTuple):
+    # a Level ready to be packed, what it shares with the game doesn't change anymore;
+    # Levels paged out to disk are packed already, see mrogue.paging
+    tiles: np.ndarray
+    explored: np.ndarray
+    floor: np.ndarray | None
+    pickled: bytes
+
+
+def references(session: mrogue.session.GameSession) -> dict[int, Reference]:
+    found: dict[int, Reference] = {id(session.player): ("player",)}
+    for index, level in enumerate(session.levels):
+        found[id(level.entities)] = ("registry", index)
+        if level.paged:
+            # nothing refers to the Entities of a paged out Level, see LevelStore.page_out
+            continue
+        others = (entity for entity in level.entities if entity is not session.player)
+        for number, entity in enumerate(others):
+            found[id(entity)] = ("entity", index, number)
+    return found
+
+
+def dumps(
+    obj: Any, references: dict[int, Reference], level: int | None = None
+) -> tuple[bytes, set[Reference]]:
+    # the pickle and the references to other chunks in it
+    buffer = io.BytesIO()
+    pickler = Pickler(buffer, references, level)
+    pickler.dump(obj)
+    return buffer.getvalue(), pickler.referenced
+
+
+def snapshot_level(
+    level: mrogue.map.Level, index: int, references: dict[int, Reference]
+) -> tuple[Level, set[Reference]]:
+    # tiles are shared read-only, Level.writable_tiles copies them if they ever change
+    level.tiles.flags.writeable = False
+    rest = {k: v for k, v in level.__dict__.items() if k not in level_arrays}
+    rest["entities"] = level.entities.__dict__
+    pickled, referenced = dumps(rest, references, index)
+    return (
+        Level(level.tiles, level.explored.copy(order="F"), level.floor, pickled),
+        referenced,
+    )
+
+
+def snapshot(
+    session: mrogue.session.GameSession, index: int, references: dict[int, Reference]
+) -> Level | bytes:
+    level = session.levels[index]
+    if level.paged:
+        assert session.level_store is not None
+        return session.level_store.chunk(session, index)
+    return snapshot_level(level, index, references)[0]
+
+
+def game_state(session: mrogue.session.GameSession, **extra: Any) -> dict[str, Any]:
+    # what is saved besides the Levels
+    assert session.player is not None
+    state = {name: getattr(session, name) for name in session_fields}
+    state["player"] = session.player.__getstate__()
+    state["random_state"] = session.random.getstate()
+    state["extra"] = extra
+    return state
+
+
+def snapshot_state(session: mrogue.session.GameSession, **extra: Any) -> bytes:
+    return dumps(game_state(session, **extra), references(session))[0]
+
+
+def pack_level(level: Level | bytes) -> bytes:
+    if isinstance(level, bytes):
+        return level
+    floor = np.zeros((0, 2)) if level.floor is None else level.floor
+    return zlib.compress(
+        b"".join(
+            (
+                level_header.pack(
+                    *level.tiles.shape,
+                    -1 if level.floor is None else len(floor),
+                    len(level.pickled),
+                ),
+                level.tiles.tobytes(order="F"),
+                # one bit per cell
+                np.packbits(level.explored.ravel(order="F")).tobytes(),
+                # coordinates fit in 16 bits
+                floor.astype(np.int16).tobytes(),
+                level.pickled,
+            )
+        ),
+        compression,
+    )
+
+
+def unpack_level(chunk: bytes) -> tuple[dict[str, Any], bytes]:
+    # the arrays of a Level and the pickled rest of it
+    data = zlib.decompress(chunk)
+    width, height, cells, pickled = level_header.unpack_from(data)
+    offset = level_header.size
+    tiles = np.frombuffer(data, mrogue.io.tile_dt, width * height, offset)
+    offset += tiles.nbytes
+    explored = np.unpackbits(
+        np.frombuffer(data, np.uint8, (width * height + 7) // 8, offset),
+        count=width * height,
+    )
+    offset += (width * height + 7) // 8
+    floor = None
+    if cells >= 0:
+        floor = np.frombuffer(data, np.int16, cells * 2, offset).reshape(cells, 2)
+        offset += floor.nbytes
+    arrays = {
+        "tiles": tiles.reshape((width, height), order="F").copy(order="F"),
+        "explored": explored.astype(bool).reshape((width, height), order="F"),
+        "floor": None if floor is None else floor.astype(np.intp),
+    }
+    return arrays, data[offset : offset + pickled]
+
+
+def assemble(chunks: list[bytes]) -> bytes:
+    offset = header.size + entry.size * len(chunks)
+    table = []
+    for chunk in chunks:
+        table.append(entry.pack(offset, len(chunk)))
+        offset += len(chunk)
+    return b"".join((header.pack(magic, version, len(chunks)), *table, *chunks))
+
+
+def dump(session: mrogue.session.GameSession, **extra: Any) -> bytes:
+    found = references(session)
+    chunks = [zlib.compress(snapshot_state(session, **extra), compression)]
+    for index in range(len(session.levels)):
+        chunks.append(pack_level(snapshot(session, index, found)))
+    return assemble(chunks)
+
+
+def replace(file_name: str, data: bytes) -> None:
+    # an interrupted write leaves the previous save in place
+    with open(file_name + ".tmp", "wb") as file:
+        file.write(data)
+    os.replace(file_name + ".tmp", file_name)
+
+
+def write(file_name: str, session: mrogue.session.GameSession, **extra: Any) -> None:
+    replace(file_name, dump(session, **extra))
+
+
+def read_table(file: BinaryIO) -> list[tuple[int, int]]:
+    found, saved_version, count = header.unpack(file.read(header.size))
+    if found != magic:
+        raise ValueError("Not a saved game.")
+    if saved_version != version:
+        raise ValueError(f"Saved games of version {saved_version} can't be loaded.")
+    return [entry.unpack(file.read(entry.size)) for _ in range(count)]
+
+
+def read_level(file_name: str, index: int) -> dict[str, Any]:
+    # the arrays of one Level, without loading the rest of the game
+    with open(file_name, "rb") as file:
+        offset, length = read_table(file)[1 + index]
+        file.seek(offset)
+        return unpack_level(file.read(length))[0]
+
+
+def load_level(
+    chunk: bytes, index: int, loaded: dict[Reference, Any]
+) -> mrogue.map.Level:
+    # the EntityRegistry of the Level is filled in, so that references to it stay valid
+    arrays, pickled = unpack_level(chunk)
+    unpickler = pickle.Unpickler(io.BytesIO(pickled))
+    unpickler.persistent_load = loaded.__getitem__  # type: ignore[method-assign]
+    rest = unpickler.load()
+    registry = loaded["registry", index]
+    registry.__dict__.update(rest.pop("entities"))
+    level = mrogue.map.Level.__new__(mrogue.map.Level)
+    level.__dict__.update(rest, entities=registry, **arrays)
+    return level
+
+
+def read(
+    file_name: str, display: mrogue.session.GameSession
+) -> tuple[mrogue.session.GameSession, dict[str, Any]]:
+    # a new, active session with the saved game, shown on the display of another one;
+    # unpickling runs code from the file, which has to be trusted
+    with open(file_name, "rb") as file:
+        table = read_table(file)
+        chunks = []
+        for offset, length in table:
+            file.seek(offset)
+            chunks.append(file.read(length))
+    session = mrogue.session.GameSession()
+    for name in ("screen", "terminal", "window_pool", "message_window"):
+        setattr(session, name, getattr(display, name))
+    session.activate()
+    # Player.__new__ and Player.__setstate__ need the session active
+    player = mrogue.player.Player.__new__(mrogue.player.Player)
+    loaded: dict[Reference, Any] = {("player",): player}
+    for index in range(len(chunks) - 1):
+        loaded["registry", index] = mrogue.EntityRegistry.__new__(mrogue.EntityRegistry)
+    # Levels first, the state refers to their Entities
+    for index, chunk in enumerate(chunks[1:]):
+        level = load_level(chunk, index, loaded)
+        session.levels.append(level)
+        others = (entity for entity in level.entities if entity is not player)
+        for number, entity in enumerate(others):
+            loaded["entity", index, number] = entity
+    unpickler = pickle.Unpickler(io.BytesIO(zlib.decompress(chunks[0])))
+    unpickler.persistent_load = loaded.__getitem__  # type: ignore[method-assign]
+    state = unpickler.load()
+    player.__setstate__(state["player"])
+    for name in session_fields:
+        setattr(session, name, state[name])
+    session.player = player
+    session.current_level = session.levels[session.depth]
+    session.random.setstate(state["random_state"])
+    return session, state["extra"]
+
+
+class Copy(NamedTuple):
+    # the game as it was at the end of a turn, taken for the worker to save while the
+    # game goes on: copies of the Levels changed since the previous one, a paged out
+    # Level as packed if there is no copy of it, and the game state with the player
+    state: dict[str, Any]
+    levels: dict[int, mrogue.map.Level | bytes]
+    size: int
+    references: dict[int, Reference]
+    # objects of the game referred to by id, kept alive so that no copy gets their ids
+    kept: list[Any]
+
+
+def copied(value: Any, memo: dict[int, Any]) -> Any:
+    if isinstance(value, list):
+        return [mrogue.forked(each, memo) for each in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return mrogue.forked(value, memo)
+
+
+class Autosave:
+    # saves the game every few turns without making the player wait: at the end of a
+    # turn the Levels played on since the previous snapshot and the game state are
+    # copied (as forks, sharing what doesn't change), a worker thread pickles, packs and
+    # writes them; saves the player asks for are written by the worker as well, to files
+    # of their own
+    def __init__(self, file_name: str, interval: int = autosave_interval) -> None:
+        self.file_name = file_name
+        self.interval = interval
+        self.turns = 0
+        # indices of Levels changed since the last snapshot, and how many there were
+        self.touched: set[int] = set()
+        self.known = 0
+        # copies of changed Levels taken as they were paged out, see paging_out
+        self.pending: dict[int, mrogue.map.Level] = {}
+        self.snapshots: queue.Queue[tuple[str, Copy]] = queue.Queue(maxsize=1)
+        # owned by the worker: the last packed chunk of every Level, and the copies of
+        # Levels a failed write didn't save, with the snapshot they came from
+        self.packed: list[bytes] = []
+        self.unsaved: dict[int, tuple[mrogue.map.Level | bytes, Copy]] = {}
+        self.error: Exception | None = None
+        threading.Thread(target=self._work, daemon=True).start()
+
+    def turn(self, session: mrogue.session.GameSession, **extra: Any) -> None:
+        # to be called at the end of every turn; the game is changed only on the
+        # current Level, the only one that can have been touched since the last turn
+        self.touched.add(session.depth)
+        if self.error is not None:
+            mrogue.message.Messenger.add(f"Autosave failed: {self.error}.")
+            self.error = None
+        self.turns += 1
+        # when the worker is still busy with the last one, the next turn tries again
+        if self.turns >= self.interval and not self.snapshots.full():
+            self.snapshot(self.file_name, session, **extra)
+
+    def attach(self, session: mrogue.session.GameSession) -> None:
+        # to be called before the game is played on, and again for a new LevelStore
+        if session.level_store is not None:
+            session.level_store.paging_out.append(self.paging_out)
+
+    def paging_out(self, session: mrogue.session.GameSession, index: int) -> None:
+        # a Level not saved since it changed is copied before it leaves memory, making
+        # it again from its seed would hold the game up
+        if index in self.touched or index >= self.known:
+            memo = {id(session.player): session.player}
+            self.pending[index] = mrogue.forked(session.levels[index], memo)
+
+    def save(
+        self, file_name: str, session: mrogue.session.GameSession, **extra: Any
+    ) -> None:
+        # right away, waiting only if the worker is behind
+        self.touched.add(session.depth)
+        self.snapshot(file_name, session, **extra)
+
+    def snapshot(
+        self, file_name: str, session: mrogue.session.GameSession, **extra: Any
+    ) -> None:
+        changed = {
+            index
+            for index in range(len(session.levels))
+            if index in self.touched or index >= self.known
+        }
+        # the other Levels are left as they are, the copies refer to them
+        memo: dict[int, Any] = {}
+        for index, level in enumerate(session.levels):
+            if index in changed and not level.paged:
+                continue
+            memo[id(level.entities)] = level.entities
+            if not level.paged:
+                memo.update((id(entity), entity) for entity in level.entities)
+        levels: dict[int, mrogue.map.Level | bytes] = {}
+        for index in sorted(changed):
+            level = session.levels[index]
+            if not level.paged:
+                levels[index] = mrogue.forked(level, memo)
+            elif index in self.pending:
+                levels[index] = self.pending[index]
+            else:
+                # paged out before this Autosave was attached, see attach
+                assert session.level_store is not None
+                levels[index] = session.level_store.chunk(session, index)
+        player = mrogue.forked(session.player, memo)
+        state = {name: copied(getattr(session, name), memo) for name in session_fields}
+        state["player"] = player
+        state["random_state"] = session.random.getstate()
+        state["extra"] = extra
+        found: dict[int, Reference] = {
+            id(player): ("player",),
+            id(session.player): ("player",),
+        }
+        kept: list[Any] = [session.player]
+        for index, level in enumerate(session.levels):
+            copy = levels.get(index, level)
+            if isinstance(copy, bytes):
+                copy = level
+            found[id(copy.entities)] = ("registry", index)
+            kept.append(copy.entities)
+            if copy.paged:
+                continue
+            others = [
+                entity
+                for entity in copy.entities
+                if entity not in (player, session.player)
+            ]
+            for number, entity in enumerate(others):
+                found[id(entity)] = ("entity", index, number)
+            kept.extend(others)
+        self.snapshots.put(
+            (file_name, Copy(state, levels, len(session.levels), found, kept))
+        )
+        self.known = len(session.levels)
+        self.pending.clear()
+        # what happens on the current Level until the next turn goes into the next one
+        self.touched = {session.depth}
+        self.turns = 0
+
+    def reset(self) -> None:
+        # another game is played from now on, none of its Levels are saved yet
+        self.known = 0
+        self.touched = set()
+        self.pending.clear()
+
+    def sync(self) -> None:
+        # wait until every snapshot is written
+        self.snapshots.join()
+
+    def _work(self) -> None:
+        # whatever goes wrong is reported on the next turn, the worker carries on
+        while True:
+            file_name, snapshot = self.snapshots.get()
+            try:
+                self._write(file_name, snapshot)
+            except Exception as error:
+                log.exception("autosave to %s failed", file_name)
+                self.error = error
+            finally:
+                self.snapshots.task_done()
+
+    def _write(self, file_name: str, snapshot: Copy) -> None:
+        # Levels a failed write didn't save go with this one, unless it has newer copies
+        unsaved = {
+            index: each for index, each in self.unsaved.items() if index < snapshot.size
+        }
+        unsaved.update(
+            (index, (level, snapshot)) for index, level in snapshot.levels.items()
+        )
+        self.unsaved = unsaved
+        packed = self.packed[: snapshot.size]
+        for index in sorted(unsaved):
+            level, taken = unsaved[index]
+            if not isinstance(level, bytes):
+                level = pack_level(snapshot_level(level, index, taken.references)[0])
+            if index < len(packed):
+                packed[index] = level
+            elif index == len(packed):
+                packed.append(level)
+            else:
+                raise RuntimeError(f"Level {index} was never saved.")
+        if len(packed) != snapshot.size:
+            raise RuntimeError(f"Level {len(packed)} was never saved.")
+        state = dict(snapshot.state, player=snapshot.state["player"].__getstate__())
+        pickled = dumps(state, snapshot.references)[0]
+        replace(file_name, assemble([zlib.compress(pickled, compression), *packed]))
+        self.packed = packed
+        self.unsaved = {}
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Any, Callable, cast
+
+import mrogue.terminal
+
+# telnet commands (negotiation, subnegotiation) and the line ending telnet sends for Enter
+telnet_command = re.compile(rb"\xff(?:[\xfb-\xfe].|\xfa.*?\xff\xf0|[\xf0-\xfa])", re.S)
+telnet_return = re.compile(rb"\r[\n\x00]")
+# the server echoes nothing and wants single key presses instead of lines
+telnet_setup = b"\xff\xfb\x01\xff\xfb\x03"
+
+
+class Connection(mrogue.terminal.Terminal):
+    # a player's terminal on the other end of a network connection; the game awaits
+    # its keys, so that all the games are played in the server's event loop
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        super().__init__()
+        self.writer = writer
+        self.pending: asyncio.Queue[tuple[int, int] | None] = asyncio.Queue()
+
+    def write(self, data: str) -> None:
+        self.writer.write(data.encode())
+
+    async def receive(self, reader: asyncio.StreamReader) -> None:
+        while data := await reader.read(1024):
+            data = telnet_return.sub(b"\r", telnet_command.sub(b"", data))
+            for key in mrogue.terminal.decode_keys(data.decode(errors="ignore")):
+                self.pending.put_nowait(key)
+        # hung up
+        self.pending.put_nowait(None)
+
+    def read(self, block: bool) -> list[tuple[int, int]]:
+        # only what arrived already, waiting is done by awaiting keys
+        return self.taken([])
+
+    async def keys(self) -> list[tuple[int, int]]:
+        # what the game drew goes out before waiting for the player to answer it
+        await self.writer.drain()
+        return self.taken([await self.pending.get()])
+
+    def taken(self, keys: list[tuple[int, int] | None]) -> list[tuple[int, int]]:
+        while not self.pending.empty():
+            keys.append(self.pending.get_nowait())
+        if None in keys:
+            raise SystemExit
+        return cast(list[tuple[int, int]], keys)
+
+
+async def play(
+    new_game: Callable[[Connection], Any],
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    # every connection is a task of its own, with its own copy of the active game
+    connection = Connection(writer)
+    receiving = asyncio.ensure_future(connection.receive(reader))
+    writer.write(telnet_setup)
+    try:
+        connection.write("\x1b[2J\x1b[?25l")
+        await new_game(connection).mainloop()
+    except (SystemExit, ConnectionError):
+        pass
+    finally:
+        receiving.cancel()
+        connection.write("\x1b[0m\x1b[?25h\x1b[2J\x1b[H")
+        writer.close()
+
+
+def serve(
+    new_game: Callable[[Connection], Any], host: str = "127.0.0.1", port: int = 4000
+) -> None:
+    async def main() -> None:
+        server = await asyncio.start_server(
+            lambda reader, writer: play(new_game, reader, writer), host, port
+        )
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
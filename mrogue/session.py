@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import random
+from collections import deque
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+import mrogue
+
+if TYPE_CHECKING:
+    import tcod.console
+
+    import mrogue.io
+    import mrogue.map
+    import mrogue.paging
+    import mrogue.player
+    import mrogue.terminal
+    import mrogue.timers
+    import mrogue.unit
+
+
+# what the values toggled into the state hash stand for: Entity attributes, the groups
+# an Entity is in and the layouts of Levels
+hash_codes = {
+    "groups": 0,
+    "pos": 1,
+    "current_HP": 2,
+    "max_HP": 3,
+    "_amount": 4,
+    "tiles": 5,
+}
+
+
+class GameSession:
+    # everything that belongs to one game; content tables (templates, monster data,
+    # tilesets) are shared by all the games in the process
+    def __init__(self) -> None:
+        self.levels: list[mrogue.map.Level] = []
+        self.depth = 0
+        self.current_level: mrogue.map.Level | None = None
+        # where inactive Levels are paged out to, if they are
+        self.level_store: mrogue.paging.LevelStore | None = None
+        self.map_dimensions: mrogue.Point | None = None
+        # Levels are generated from seeds derived from this one, see Dungeon.generate
+        self.dungeon_seed = 0
+        self.player: mrogue.player.Player | None = None
+        self.screen: mrogue.io.Screen | None = None
+        self.terminal: mrogue.terminal.Terminal | None = None
+        self.dirty: set[str] = set()
+        # keys pressed but not handled yet, oldest first
+        self.typeahead: deque[tuple[int, int]] = deque()
+        self.window_pool: dict[str, tcod.console.Console] = {}
+        self.messages: list[str] = []
+        self.message_history: list[str] = []
+        self.message_window: tcod.console.Console | None = None
+        self.timers: list[mrogue.timers.Timer] = []
+        self.turn_order: list[mrogue.unit.Unit] | None = None
+        self.acting_initiative = 0
+        # unidentified appearances of Consumables, rolled anew for every game
+        self.scroll_names: dict[str, str] = {}
+        self.potion_colors: dict[str, tuple[str, tuple[int, int, int]]] = {}
+        # every game draws its random numbers from a generator of its own, see rng;
+        # seeded from the random module, seeding that first makes the game repeatable
+        self.random = random.Random(random.getrandbits(64))
+        self.serials = 0
+        # XOR of a hash for every hashed value in the game, see toggle
+        self.running_hash = 0
+
+    def activate(self) -> None:
+        # the engine works on this game from now on, in the current thread
+        active.set(self)
+
+    def new_serial(self) -> int:
+        self.serials += 1
+        return self.serials
+
+    def toggle(self, serial: int, code: int, value: Any) -> None:
+        # the same call puts a value into the running hash and takes it out again;
+        # () stands in for None, whose hash differs from process to process
+        self.running_hash ^= hash((serial, code, () if value is None else value))
+
+    def state_hash(self) -> int:
+        # equal in every run that played the game the same way, and for its forks
+        return hash((self.running_hash, self.depth))
+
+    def fork(self) -> GameSession:
+        # an independent copy of the game for what-if play; only what changes during
+        # a game is copied, level layouts are shared until written to
+        memo: dict[int, Any] = {}
+        clone = GameSession.__new__(GameSession)
+        clone.__dict__.update(self.__dict__)
+        clone.levels = [mrogue.forked(level, memo) for level in self.levels]
+        if self.level_store is not None:
+            clone.level_store = self.level_store.fork()
+        clone.current_level = mrogue.forked(self.current_level, memo)
+        clone.player = mrogue.forked(self.player, memo)
+        clone.dirty = set(self.dirty)
+        clone.typeahead = deque()
+        clone.messages = list(self.messages)
+        clone.message_history = list(self.message_history)
+        clone.timers = [mrogue.forked(timer, memo) for timer in self.timers]
+        if self.turn_order is not None:
+            clone.turn_order = [mrogue.forked(unit, memo) for unit in self.turn_order]
+        clone.random = random.Random()
+        clone.random.setstate(self.random.getstate())
+        return clone
+
+
+active: ContextVar[GameSession] = ContextVar("active")
+
+
+def current() -> GameSession:
+    return active.get()
+
+
+def rng() -> random.Random:
+    # the random generator of the active game
+    return active.get().random
+
+
+class SessionAttribute:
+    # a class attribute whose value belongs to the active GameSession;
+    # assign it through the session, assigning to the class would replace this descriptor
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        return getattr(active.get(), self.name)
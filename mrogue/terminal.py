@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import atexit
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import TextIO
+
+import numpy as np
+import tcod.console
+import tcod.event
+
+# CSI and SS3 sequences of the keys used by the game, with an optional xterm modifier
+escape_sequence = re.compile(r"\x1b(?:\[(?:(\d+)(?:;(\d+))?)?([A-DHF~])|O([A-DHF]))")
+final_keys = {
+    "A": tcod.event.K_UP,
+    "B": tcod.event.K_DOWN,
+    "C": tcod.event.K_RIGHT,
+    "D": tcod.event.K_LEFT,
+    "H": tcod.event.K_HOME,
+    "F": tcod.event.K_END,
+}
+tilde_keys = {
+    "3": tcod.event.K_DELETE,
+    "5": tcod.event.K_PAGEUP,
+    "6": tcod.event.K_PAGEDOWN,
+}
+# xterm encodes modifiers as 1 + a bit mask: 1 Shift, 2 Alt, 4 Ctrl
+modifier_bits = (
+    (1, tcod.event.KMOD_LSHIFT),
+    (2, tcod.event.KMOD_LALT),
+    (4, tcod.event.KMOD_LCTRL),
+)
+# characters typed with Shift on a US layout, reported as the unshifted key like SDL does
+shifted = dict(zip('~!@#$%^&*()_+{}|:"<>?', "`1234567890-=[]\\;',./"))
+
+# unchanged cells between two changes are resent when that is shorter than moving the cursor
+max_gap = 4
+
+
+def decode_keys(data: str) -> list[tuple[int, int]]:
+    keys = []
+    i = 0
+    while i < len(data):
+        if match := escape_sequence.match(data, i):
+            number, modifier, final, ss3_final = match.groups()
+            if final == "~":
+                sym = tilde_keys.get(number)
+            else:
+                sym = final_keys[final or ss3_final]
+            bits = int(modifier) - 1 if modifier else 0
+            mod = sum(flag for bit, flag in modifier_bits if bits & bit)
+            if sym is not None:
+                keys.append((sym, mod))
+            i = match.end()
+            continue
+        char = data[i]
+        i += 1
+        if char == "\x1b":
+            keys.append((tcod.event.K_ESCAPE, tcod.event.KMOD_NONE))
+        elif char in "\r\n":
+            keys.append((tcod.event.K_RETURN, tcod.event.KMOD_NONE))
+        elif char in "\x7f\x08":
+            keys.append((tcod.event.K_BACKSPACE, tcod.event.KMOD_NONE))
+        elif char == "\t":
+            keys.append((tcod.event.K_TAB, tcod.event.KMOD_NONE))
+        elif "\x01" <= char <= "\x1a":
+            keys.append((ord(char) + 96, tcod.event.KMOD_LCTRL))
+        elif char.isupper():
+            keys.append((ord(char.lower()), tcod.event.KMOD_LSHIFT))
+        elif char in shifted:
+            keys.append((ord(shifted[char]), tcod.event.KMOD_LSHIFT))
+        elif char.isprintable():
+            keys.append((ord(char), tcod.event.KMOD_NONE))
+    return keys
+
+
+class Terminal(ABC):
+    # draws consoles with ANSI sequences, sending only the cells changed since the last frame
+    def __init__(self) -> None:
+        self.previous: np.ndarray | None = None
+        self.pen: tuple[tuple[int, ...], tuple[int, ...]] | None = None
+
+    def diff(self, console: tcod.console.Console) -> str:
+        # consoles here use "F" order, transposing gives [y, x]
+        cells = console.rgba.T.copy()
+        raw = cells.view(np.uint8).reshape(*cells.shape, -1)
+        if self.previous is None or self.previous.shape != raw.shape:
+            changed = np.ones(cells.shape, bool)
+            self.pen = None
+        else:
+            changed = (raw != self.previous).any(axis=-1)
+        self.previous = raw
+        out = []
+        for y in np.flatnonzero(changed.any(axis=1)):
+            xs = np.flatnonzero(changed[y])
+            # split into runs wherever the gap is too wide to be worth resending
+            breaks = np.flatnonzero(np.diff(xs) > max_gap + 1) + 1
+            for run in np.split(xs, breaks):
+                out.append(f"\x1b[{y + 1};{run[0] + 1}H")
+                for x in range(run[0], run[-1] + 1):
+                    out.append(self._cell(cells[y, x]))
+        return "".join(out)
+
+    def _cell(self, cell: np.void) -> str:
+        fg, bg = tuple(cell["fg"][:3]), tuple(cell["bg"][:3])
+        prefix = ""
+        if self.pen is None or self.pen[0] != fg:
+            prefix += "38;2;{};{};{};".format(*fg)
+        if self.pen is None or self.pen[1] != bg:
+            prefix += "48;2;{};{};{};".format(*bg)
+        self.pen = fg, bg
+        char = chr(cell["ch"]) if cell["ch"] > 32 else " "
+        return f"\x1b[{prefix[:-1]}m{char}" if prefix else char
+
+    def present(self, console: tcod.console.Console) -> None:
+        self.write(self.diff(console))
+
+    @abstractmethod
+    def write(self, data: str) -> None:
+        pass
+
+    @abstractmethod
+    def read(self, block: bool) -> list[tuple[int, int]]:
+        pass
+
+    async def keys(self) -> list[tuple[int, int]]:
+        # blocks, a terminal of its own is all the process waits on
+        return self.read(True)
+
+
+class LocalTerminal(Terminal):
+    # the terminal the game was started from, in place of an SDL window; POSIX only,
+    # the modules it needs are imported here so the rest of the game runs anywhere
+    def __init__(self, stdin: TextIO, stdout: TextIO) -> None:
+        import termios
+        import tty
+
+        super().__init__()
+        self.stdin = stdin
+        self.stdout = stdout
+        self.fd = stdin.fileno()
+        self.settings = termios.tcgetattr(self.fd) if stdin.isatty() else None
+        if self.settings:
+            tty.setcbreak(self.fd)
+        # alternate screen, hidden cursor
+        self.stdout.write("\x1b[?1049h\x1b[?25l\x1b[2J")
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        self.stdout.write("\x1b[0m\x1b[?25h\x1b[?1049l")
+        self.stdout.flush()
+        if self.settings:
+            import termios
+
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self.settings)
+
+    def write(self, data: str) -> None:
+        self.stdout.write(data)
+        self.stdout.flush()
+
+    def read(self, block: bool) -> list[tuple[int, int]]:
+        import select
+
+        if not select.select([self.fd], [], [], None if block else 0)[0]:
+            return []
+        data = os.read(self.fd, 1024)
+        if not data:
+            raise SystemExit
+        return decode_keys(data.decode(errors="ignore"))
@@ -1,14 +1,41 @@
 # -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from functools import partial
+from types import MethodType
+from typing import Any
+
+import mrogue
+from mrogue.session import SessionAttribute
 
 
 class Timer:
-    all_timers = []
+    all_timers = SessionAttribute("timers")
 
     def __init__(self, duration, action):
         self.duration = duration
         self.action = action
         self.all_timers.append(self)
 
+    def fork(self, memo: dict[int, Any]) -> Timer:
+        # actions are bound methods or partials, their targets are looked up in the fork
+        clone = memo[id(self)] = Timer.__new__(Timer)
+        clone.duration = self.duration
+        action = self.action
+        if isinstance(action, MethodType):
+            action = MethodType(action.__func__, mrogue.forked(action.__self__, memo))
+        elif isinstance(action, partial):
+            action = partial(
+                action.func,
+                *(mrogue.forked(arg, memo) for arg in action.args),
+                **{
+                    key: mrogue.forked(value, memo)
+                    for key, value in action.keywords.items()
+                },
+            )
+        clone.action = action
+        return clone
+
     @classmethod
     def update(cls):
         for t in cls.all_timers:
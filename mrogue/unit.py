@@ -1,16 +1,19 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import random
 from copy import copy
 from sys import argv
 from typing import TYPE_CHECKING, Any
 
 import tcod.constants
 
+import mrogue.item.inventory
 import mrogue.map
 import mrogue.message
+import mrogue.modifiers
+import mrogue.session
 import mrogue.utils
+from mrogue.item.inventory import Inventory
 
 if TYPE_CHECKING:
     import mrogue.item
@@ -27,6 +30,8 @@ class AbilityScore:
 
 
 class Unit(mrogue.Entity):
+    layer = "units"
+
     def __init__(
         self,
         name: str,
@@ -42,13 +47,12 @@ class Unit(mrogue.Entity):
     ):
         super().__init__()
         self.player = False
-        self.inventory: list[Any] = []
-        self.equipped: list[Any] = []
+        self.inventory: Inventory[mrogue.item.item.Item] = Inventory()
+        self.equipped: Inventory[mrogue.item.item.Wearable] = Inventory()
         self.name = name
         self.pos = mrogue.map.Dungeon.find_spot()
         self.icon = icon[0]
         self.color = vars(tcod.constants)[icon[1]]
-        # self.layer = 1
         self.sight_range = sight_range
         self.abilities = {
             "str": AbilityScore("Strength", abi_scores[0]),
@@ -56,8 +60,6 @@ class Unit(mrogue.Entity):
             "con": AbilityScore("Constitution", abi_scores[2]),
         }
         self.load_thresholds = (5.0, 30.0, 50.0)
-        self.speed_bonus = 1.0
-        self.speed = speed
         self.initiative = int(speed * 100)
         self.keywords = keywords
         self.proficiency = proficiency
@@ -66,13 +68,15 @@ class Unit(mrogue.Entity):
             if "finesse" in keywords
             else self.abilities["str"].mod
         )
-        self.to_hit = self.proficiency + self.ability_bonus
         self.default_damage_dice = damage_range
-        self.damage_dice = self.default_damage_dice
         self.base_armor_class = 10 + self.abilities["dex"].mod
         self.ac_bonus = ac_bonus
-        self.armor_class = self.base_armor_class + self.ac_bonus
-        self.damage_reduction = self.armor_class / 100
+        self.stats = mrogue.modifiers.Stats(
+            to_hit=self.proficiency + self.ability_bonus,
+            damage_dice=self.default_damage_dice,
+            armor_class=self.base_armor_class + self.ac_bonus,
+            speed=speed,
+        )
         self.current_HP = base_hp_from_dice + self.abilities["con"].mod
         self.max_HP = base_hp_from_dice
         self.moved = False
@@ -83,6 +87,34 @@ class Unit(mrogue.Entity):
     def __str__(self) -> str:
         return f"{chr(self.icon)} '{self.name}'"  # " [{self.color}]"
 
+    def fork(self, memo: dict[int, Any]) -> Unit:
+        clone = super().fork(memo)
+        assert isinstance(clone, Unit)
+        clone.inventory = mrogue.forked(self.inventory, memo)
+        clone.equipped = mrogue.forked(self.equipped, memo)
+        clone.stats = mrogue.forked(self.stats, memo)
+        return clone
+
+    @property
+    def to_hit(self) -> int:
+        return self.stats["to_hit"]
+
+    @property
+    def damage_dice(self) -> tuple[int, int]:
+        return self.stats["damage_dice"]
+
+    @property
+    def armor_class(self) -> int:
+        return self.stats["armor_class"]
+
+    @property
+    def damage_reduction(self) -> float:
+        return self.armor_class / 100
+
+    @property
+    def speed(self) -> float:
+        return self.stats["speed"]
+
     def update(self) -> None:
         self.moved = False
         self.initiative = int(self.speed * 100) if self.speed != 0.0 else 100
@@ -94,36 +126,15 @@ class Unit(mrogue.Entity):
         item.add(self.inventory)
         self.burden_update()
 
-    def use(self, item: mrogue.item.item.Consumable) -> None:
-        effect = item.used(self)
+    async def use(self, item: mrogue.item.item.Consumable) -> None:
+        effect = await item.used(self)
         self.burden_update()
         mrogue.message.Messenger.add(effect)
 
-    def recalculate_stats_from_items(self) -> None:
-        # weapon
-        self.to_hit = self.proficiency + self.ability_bonus
-        self.damage_dice = self.default_damage_dice
-        item = mrogue.utils.find_in(
-            self.equipped, "props", mrogue.item.item.Wearable.Weapon
-        )
-        if item:
-            self.to_hit += item.props.to_hit_modifier
-            self.damage_dice = (
-                item.props.damage[0] + self.abilities["str"].mod,
-                item.props.damage[1] + self.abilities["str"].mod,
-            )
-        # armor
-        bonus_ac_equipped = sum(
-            [
-                i.props.armor_class_modifier
-                for i in self.equipped
-                if type(i.props) == mrogue.item.item.Wearable.Armor
-            ]
-        )
-        self.armor_class = (
-            10 + self.abilities["dex"].mod + self.ac_bonus + bonus_ac_equipped
-        )
-        self.damage_reduction = self.armor_class / 100
+    def update_item_modifiers(self, item: mrogue.item.item.Wearable) -> None:
+        # to be called when an equipped item changes its properties
+        if item in self.equipped:
+            self.stats.set(item, *item.modifiers(self))
 
     def equip(self, item: mrogue.item.item.Wearable, quiet: bool = False) -> bool:
         slot = [item.slot]
@@ -133,15 +144,15 @@ class Unit(mrogue.Entity):
             slot = ["main", "both"]
         elif item.slot == "off":
             slot = ["both", "off"]
-        for i in self.equipped.copy():
-            if i.slot in slot:
-                if i.enchantment_level < -1:
-                    mrogue.message.Messenger.add("You can't replace cursed items.")
-                    return False
-                self.unequip(i)
+        for i in [i for s in slot for i in self.equipped.in_slot(s)]:
+            if i.enchantment_level < -1:
+                mrogue.message.Messenger.add("You can't replace cursed items.")
+                return False
+            self.unequip(i)
         item.add(self.equipped)
         item.remove(self.inventory)
-        self.recalculate_stats_from_items()
+        item.invalidate_interface_name()
+        self.update_item_modifiers(item)
         msg = f"{self.name.capitalize()} equipped {item.name}."
         if self.player:
             item.identified()
@@ -157,32 +168,46 @@ class Unit(mrogue.Entity):
             return False
         item.add(self.inventory)
         item.remove(self.equipped)
-        self.recalculate_stats_from_items()
+        item.invalidate_interface_name()
+        self.stats.clear(item)
         msg = f"{self.name.capitalize()} unequipped {item.name}."
         if not quiet:
             mrogue.message.Messenger.add(msg)
         return True
 
     def drop_item(self, item: mrogue.item.item.Item, quiet: bool = False) -> None:
-        if item.amount > 1:
-            item.amount -= 1
-            new_item = copy(item)
-            new_item.amount = 1
-            new_item.dropped(self.pos)
-        else:
-            item.remove(self.inventory, self.equipped)
-            item.dropped(self.pos)
+        self.drop_items([item], quiet)
+
+    def drop_items(
+        self, items: list[mrogue.item.item.Item], quiet: bool = False
+    ) -> None:
+        for item in items:
+            if item.amount > 1:
+                item.amount -= 1
+                new_item = copy(item)
+                new_item.amount = 1
+                new_item.dropped(self.pos)
+            else:
+                item.remove(self.inventory, self.equipped)
+                item.dropped(self.pos)
+            msg = f"{self.name.capitalize()} dropped {item.name}."
+            if not quiet:
+                mrogue.message.Messenger.add(msg)
+        # derived stats are updated once for the whole batch
         self.burden_update()
-        msg = f"{self.name.capitalize()} dropped {item.name}."
-        if not quiet:
-            mrogue.message.Messenger.add(msg)
 
     def pickup_item(self, item_list: list[mrogue.item.item.Item]) -> bool:
-        if item_list:
-            item = item_list.pop(0)
-            if issubclass(type(item), mrogue.item.item.Stackable):
+        return self.pickup_items(item_list[:1])
+
+    def pickup_items(self, items: list[mrogue.item.item.Item]) -> bool:
+        if not items:
+            msg = "There are no items here."
+            mrogue.message.Messenger.add(msg)
+            return False
+        for item in items:
+            if isinstance(item, mrogue.item.item.Stackable):
                 # in case of Stackables, pick just a singular amount
-                existing_item = mrogue.utils.find_in(self.inventory, "name", item.name)
+                existing_item = self.inventory.stack_for(item)
                 if existing_item:
                     existing_item.amount += 1
                 else:
@@ -196,14 +221,11 @@ class Unit(mrogue.Entity):
             else:
                 item.add(self.inventory)
                 item.picked()
-            self.burden_update()
             msg = f"{self.name.capitalize()} picked up {item.name}."
             mrogue.message.Messenger.add(msg)
-            return True
-        else:
-            msg = "There are no items here."
-            mrogue.message.Messenger.add(msg)
-            return False
+        # derived stats are updated once for the whole batch
+        self.burden_update()
+        return True
 
     def move(self, success: bool = True) -> None:
         self.moved = success
@@ -213,7 +235,7 @@ class Unit(mrogue.Entity):
         attack_roll = mrogue.utils.roll(1, 20)
         critical_hit = attack_roll == 20
         if type(target) == mrogue.player.Player and critical_hit:
-            critical_hit = random.random() > target.crit_immunity
+            critical_hit = mrogue.session.rng().random() > target.crit_immunity
         if critical_hit or attack_roll + self.to_hit >= target.armor_class:
             damage_roll = mrogue.utils.roll(*self.damage_dice, critical_hit)
             msg += f"{'critically ' if critical_hit else ''}hit{'' if self.player else 's'}"
@@ -243,11 +265,6 @@ class Unit(mrogue.Entity):
         if not (self.player and "debug" in argv):
             self.kill()
             if not self.player:
-                for worn in self.equipped:
+                for worn in list(self.equipped):
                     self.unequip(worn, quiet=True, force=True)
-                for carried in self.inventory:
-                    self.drop_item(carried, quiet=True)
-            self.remove(
-                mrogue.map.Dungeon.current_level.units,
-                mrogue.map.Dungeon.current_level.objects_on_map,
-            )
+                self.drop_items(list(self.inventory), quiet=True)
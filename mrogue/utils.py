@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import random
 import string
-from typing import TYPE_CHECKING, Any, Callable, Iterator, Sequence
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Sequence
+
+import mrogue.session
 
 if TYPE_CHECKING:
     from mrogue import Point
@@ -14,7 +16,7 @@ def adjacent(fr: Point, to: Point, distance: int = 1) -> bool:
 
 
 def find_in(
-    where: Sequence[Any],
+    where: Iterable[Any],
     attribute: str,
     like: Any,
     instance: type = None,
@@ -24,7 +26,7 @@ def find_in(
     #       f"matching {like}, must be {instance}, many={many}:")
     results = []
     if instance:
-        where = filter(lambda x: isinstance(x, instance), where)  # type: ignore
+        where = filter(lambda x: isinstance(x, instance), where)
     for element in where:
         value = getattr(element, attribute)
         if (type(value) if type(like) == type else value) == like:
@@ -45,15 +47,15 @@ def print_result(func: Callable[..., Any]) -> Callable[..., Any]:
 
 
 def roll(left: int, right: int, critical: bool = False) -> int:
-    roll_result = random.randint(max(0, left), max(0, right))
+    roll_result = mrogue.session.rng().randint(max(0, left), max(0, right))
     return roll_result + (roll_result // 2 if critical else 0)
 
 
 def random_scroll_name() -> str:
     name = ""
-    for i in range(random.randint(1, 3)):
-        for j in range(random.randint(3, 5)):
-            name += random.choice(string.ascii_uppercase)
+    for i in range(mrogue.session.rng().randint(1, 3)):
+        for j in range(mrogue.session.rng().randint(3, 5)):
+            name += mrogue.session.rng().choice(string.ascii_uppercase)
         name += " "
     return name.rstrip()
 
@@ -62,3 +64,22 @@ def circular(sequence: Sequence[Any]) -> Iterator[Any]:
     while sequence:
         for element in sequence:
             yield element
+
+
+class Stopwatch:
+    def __init__(self) -> None:
+        self.laps: list[tuple[str, float]] = []
+        self._last = perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = perf_counter()
+        self.laps.append((stage, now - self._last))
+        self._last = now
+
+    def report(self) -> str:
+        width = max(len(stage) for stage, _ in self.laps)
+        lines = [
+            f"{stage:<{width}} {seconds * 1000:8.1f} ms" for stage, seconds in self.laps
+        ]
+        total = sum(seconds for _, seconds in self.laps)
+        return "\n".join(lines + [f"{'total':<{width}} {total * 1000:8.1f} ms"])
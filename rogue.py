@@ -1,25 +1,46 @@
 # -*- coding: utf-8 -*-
 # Copyright (C) 2018-2021 Kamil Nienałtowski
 # License: GPL-3.0-or-later
-from os import path
+from __future__ import annotations
 
-import tcod
-import tcod.event
+import gc
+import sys
+from copy import copy
+from os import path
+from sys import argv
+from time import process_time
+from typing import TYPE_CHECKING, Any, Callable
 
 import mrogue.item.manager
+import mrogue.keymap
 import mrogue.map
 import mrogue.message
 import mrogue.monster
 import mrogue.player
+import mrogue.session
 import mrogue.timers
 import mrogue.utils
 
+# saving, paging, the server and terminals are imported where they are used, a cold
+# start pays only for what it needs
+if TYPE_CHECKING:
+    import mrogue.save
+    import mrogue.terminal
+
 
 class Rogue:
     turn = 0
     num_objects = 10
 
-    def __init__(self) -> None:
+    def __init__(
+        self, terminal: mrogue.terminal.Terminal | None = None, hosted: bool = False
+    ) -> None:
+        startup = mrogue.utils.Stopwatch()
+        # CPU time spent before, on starting Python and importing the game
+        startup.laps.append(("imports", process_time()))
+        # the state of this game, the engine finds it through mrogue.session.current()
+        self.session = mrogue.session.GameSession()
+        self.session.activate()
         self.fonts = mrogue.utils.circular(
             [
                 ("terminal10x16_gs_ro.png", (10, 16)),
@@ -33,105 +54,218 @@ class Rogue:
                 ("Curses_square_24.png", (24, 24)),
             ]
         )
-        font = tcod.tileset.load_tilesheet(
-            path.join(mrogue.work_dir, "data", next(self.fonts)[0]),
-            16,
-            16,
-            tcod.tileset.CHARMAP_CP437,
+        self.tilesets = mrogue.io.Tilesets(path.join(mrogue.work_dir, "data", ".cache"))
+        font = next(self.fonts)[0]
+        mrogue.io.Screen(
+            100,
+            40,
+            # terminals draw with their own font
+            self.tilesets.get(font) if terminal is None else None,
+            threaded="threaded" in argv and not hosted,
+            terminal=terminal,
         )
-        mrogue.io.Screen(100, 40, font)
-        self.dungeon = mrogue.map.Dungeon()
+        startup.lap("screen")
         self.items = mrogue.item.manager.ItemManager()
-        mrogue.monster.MonsterManager().create_monsters(
-            self.num_objects, self.dungeon.depth()
-        )
+        startup.lap("item templates")
+        # the first level comes with its loot and monsters
+        self.dungeon = mrogue.map.Dungeon(self.num_objects)
+        startup.lap("level")
         self.messenger = mrogue.message.Messenger()
         self.player = mrogue.player.Player()
-        self.items.create_loot(self.num_objects)
+        self.watched: tuple[int, int] | None = None
+        # a loaded game was saved while waiting for the player, the world has had its turn
+        self.resumed = False
+        self.keymap = mrogue.keymap.Keymap()
+        self.autosave: mrogue.save.Autosave | None = None
+        self.handlers = self._handlers()
+        startup.lap("player")
+        if hosted:
+            # the game ends with its connection, while the server process goes on
+            return
+        # games hosted for others can't be saved, they would share one file
+        self.start_saving()
+        startup.lap("saving")
+        # everything created so far lives for the whole session, keep it out of gc passes
+        gc.freeze()
+        startup.lap("gc freeze")
+        if "profile" in argv:
+            print(startup.report())
+
+    def _handlers(self) -> dict[str, Callable[[tuple[int, int]], Any]]:
+        return {
+            "inventory": lambda key: self.items.show_inventory(),
+            "equipment": lambda key: self.items.show_equipment(),
+            "pickup": lambda key: self.player.pickup(self.items),
+            "descend": lambda key: self.dungeon.descend(
+                self.player.pos, self.num_objects
+            ),
+            "ascend": lambda key: self.dungeon.ascend(self.player.pos),
+            "run": lambda key: self.dungeon.automove(
+                self.player.pos,
+                self.keymap.deltas[key[0]],
+                self.draw_dungeon,
+                self.update_dungeon,
+            ),
+            "move": lambda key: self.dungeon.movement(
+                self.player, self.keymap.step(key, self.player.pos)
+            ),
+            "messages": lambda key: self.messenger.message_screen(),
+            "help": lambda key: mrogue.io.help_screen(),
+            "quit": lambda key: True,
+            "save": lambda key: self.save(),
+            "change_font": self.change_font,
+        }
+
+    def start_saving(self) -> None:
+        import mrogue.paging
+        import mrogue.save
+
+        # inactive levels are kept on disk, memory stays bounded however deep it goes
+        self.session.level_store = mrogue.paging.LevelStore()
+        self.autosave = mrogue.save.Autosave(mrogue.save.autosave_file)
+        self.autosave.attach(self.session)
+
+    def save(self) -> None:
+        import mrogue.save
+
+        if self.autosave is None:
+            self.messenger.add("This game can't be saved.")
+            return
+        self.autosave.save(mrogue.save.default_file, self.session, turn=self.turn)
+        self.messenger.add("Game saved.")
+
+    def load(self, file_name: str) -> None:
+        import mrogue.paging
+        import mrogue.save
 
-    def update_dungeon(self) -> bool:
+        store = self.session.level_store
+        self.session, extra = mrogue.save.read(file_name, self.session)
+        if store is not None:
+            self.session.level_store = mrogue.paging.LevelStore(store.resident)
+        assert self.session.player is not None
+        self.player = self.session.player
+        self.turn = extra["turn"]
+        self.watched = None
+        self.resumed = True
+        if self.autosave is not None:
+            self.autosave.reset()
+            self.autosave.attach(self.session)
+        mrogue.io.Screen.invalidate()
+
+    def fork(self) -> Rogue:
+        # the same game going on separately from this one, e.g. to try moves out
+        clone = copy(self)
+        clone.session = self.session.fork()
+        assert clone.session.player is not None
+        clone.player = clone.session.player
+        clone.handlers = clone._handlers()
+        # only the game itself is saved
+        clone.autosave = None
+        return clone
+
+    async def update_dungeon(self) -> bool:
+        self.advance()
+        return await self.player.check_pulse(self.dungeon, self.messenger)
+
+    def advance(self) -> None:
+        # the rest of the world takes its turn after the player, nothing is drawn
         self.turn += 1
+        mrogue.io.Screen.invalidate()
         mrogue.timers.Timer.update()
         if self.turn > 1:  # so that the player has first move
-            mrogue.monster.MonsterManager().handle_monsters(self.player)
+            mrogue.monster.MonsterManager.handle_monsters(self.player)
         self.dungeon.look_around()
-        return self.player.check_pulse(self.dungeon, self.messenger)
 
-    def draw_dungeon(self) -> None:
-        self.dungeon.draw_map()
-        self.player.show_stats()
-        self.messenger.show()
+    def alarmed(self) -> bool:
+        # whether the player got hurt or more monsters came into sight since the last turn
+        fov = self.player.fov
+        in_sight = sum(
+            bool(fov[unit.pos])
+            for unit in self.dungeon.current_level.entities.units
+            if unit is not self.player
+        )
+        watched, self.watched = self.watched, (self.player.current_HP, in_sight)
+        return watched is not None and (
+            self.watched[0] < watched[0] or self.watched[1] > watched[1]
+        )
+
+    async def draw_dungeon(self) -> None:
+        dirty = mrogue.io.Screen.dirty
+        if not dirty:
+            return
+        if "map" in dirty:
+            # clears the whole screen, so the other layers have to be put back too
+            self.dungeon.draw_map()
+            dirty.update(mrogue.io.Screen.layers)
+        if "status" in dirty:
+            self.player.show_stats()
+        await self.messenger.show()
         mrogue.io.Screen.present()
+        dirty.clear()
 
-    def handle_input(self, key: tuple[int, int]) -> bool:
-        # 'i'
-        if mrogue.io.key_is(key, tcod.event.K_i):
-            if self.items.show_inventory():
-                return True
-        # 'e'
-        elif mrogue.io.key_is(key, tcod.event.K_e):
-            if self.items.show_equipment():
-                return True
-        # ','
-        elif mrogue.io.key_is(key, tcod.event.K_COMMA):
-            if self.player.pickup(self.items):
-                return True
-        # '>'
-        elif mrogue.io.key_is(key, tcod.event.K_PERIOD, tcod.event.KMOD_SHIFT):
-            if self.dungeon.descend(self.player.pos, self.num_objects):
-                return True
-        # '<'
-        elif mrogue.io.key_is(key, tcod.event.K_COMMA, tcod.event.KMOD_SHIFT):
-            if self.dungeon.ascend(self.player.pos):
-                return True
-        # Shift + [number keys|arrows|numpad keys]
-        elif key[0] in mrogue.io.directions and mrogue.io.mod_is(
-            key[1], tcod.event.KMOD_SHIFT
-        ):
-            if self.dungeon.automove(
-                self.player.pos, key[0], self.draw_dungeon, self.update_dungeon
-            ):
-                return True
-        # number keys|arrows|numpad keys
-        elif key[0] in mrogue.io.directions:
-            if self.dungeon.movement(
-                self.player, mrogue.io.direction_from(key[0], self.player.pos)
-            ):
-                return True
-        # 'M'
-        elif mrogue.io.key_is(key, tcod.event.K_m, tcod.event.KMOD_SHIFT):
-            self.messenger.message_screen()
-        # 'H'
-        elif mrogue.io.key_is(key, tcod.event.K_h, tcod.event.KMOD_SHIFT):
-            mrogue.io.help_screen()
-        # 'Q'
-        elif mrogue.io.key_is(key, tcod.event.K_q, tcod.event.KMOD_SHIFT):
-            return True
-        # Ctrl + R
-        elif mrogue.io.key_is(key, tcod.event.K_r, tcod.event.KMOD_CTRL):
-            mrogue.io.Screen.change_font(new_font := next(self.fonts))
-            self.messenger.add(f"Changed font to {new_font[0]}.")
-        # other
-        else:
+    async def handle_input(self, key: tuple[int, int]) -> bool:
+        command = self.keymap.command(key)
+        if command is None:
             self.messenger.add("Unknown command.")
-        return False
+            return False
+        # handlers return True when the action took a turn, those showing menus and
+        # prompts return it once they get their keys
+        return bool(await mrogue.io.result_of(self.handlers[command](key)))
+
+    def change_font(self, key: tuple[int, int]) -> None:
+        new_font = next(self.fonts)
+        mrogue.io.Screen.change_font(new_font, self.tilesets.get(new_font[0]))
+        self.messenger.add(f"Changed font to {new_font[0]}.")
 
-    def mainloop(self) -> None:
+    async def mainloop(self) -> None:
         key = (0, 0)
-        while not mrogue.io.key_is(key, tcod.event.K_q, tcod.event.KMOD_SHIFT):
-            if self.update_dungeon():
+        while self.keymap.command(key) != "quit":
+            if self.resumed:
+                self.resumed = False
+            elif await self.update_dungeon():
                 break
+            elif self.autosave is not None:
+                self.autosave.turn(self.session, turn=self.turn)
+            if self.alarmed():
+                # don't act on keys pressed before the player could see what happened
+                mrogue.io.flush()
+            elif self.keymap.command(key) == "move" and mrogue.io.peek() == key:
+                # a held movement key: take repeated steps as a batch, drawing only after the last
+                await mrogue.io.wait()
+                if await self.handle_input(key):
+                    continue
             while True:
-                self.draw_dungeon()
-                key = mrogue.io.wait()
+                await self.draw_dungeon()
+                key = await mrogue.io.wait()
                 self.messenger.clear()
-                if self.handle_input(key):
+                if await self.handle_input(key):
                     break
+        # let the render thread finish before the window goes away
+        mrogue.io.Screen.sync()
+        if self.autosave is not None:
+            self.autosave.sync()
 
 
 if __name__ == "__main__":
-    rogue = Rogue()
+    if "server" in argv:
+        import mrogue.server
+
+        # every telnet connection to localhost:4000 plays its own game
+        mrogue.server.serve(lambda terminal: Rogue(terminal, hosted=True))
+        sys.exit()
+    terminal = None
+    if "terminal" in argv:
+        import mrogue.terminal
+
+        terminal = mrogue.terminal.LocalTerminal(sys.stdin, sys.stdout)
+    rogue = Rogue(terminal)
+    if "load" in argv:
+        import mrogue.save
+
+        # "load autosave" continues from the last autosave instead
+        autosaved = "autosave" in argv
+        rogue.load(mrogue.save.autosave_file if autosaved else mrogue.save.default_file)
     try:
-        rogue.mainloop()
+        mrogue.io.run(rogue.mainloop())
     except Exception:
         raise
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import mrogue.session
+from mrogue.env import Environment, actions
+from rogue import Rogue
+
+
+@pytest.fixture
+def session() -> mrogue.session.GameSession:
+    # an empty game, for the parts of the engine that only need one to be active
+    session = mrogue.session.GameSession()
+    session.activate()
+    return session
+
+
+@pytest.fixture
+def environment() -> Environment:
+    environment = Environment(lambda terminal: Rogue(terminal, hosted=True))
+    environment.reset(0)
+    environment.step(actions.index("wait"))
+    return environment
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from mrogue.effects import AcBonus, Effect, Enchant, Heal, Identify, SpeedBonus
+
+
+def test_compile() -> None:
+    heal = Effect.compile("heal 4 8")
+    assert isinstance(heal, Heal)
+    assert (heal.low, heal.high) == (4, 8)
+    assert str(heal) == "heal 4 8"
+    assert isinstance(Effect.compile("identify"), Identify)
+    enchant = Effect.compile("enchant 2")
+    assert isinstance(enchant, Enchant)
+    assert enchant.amount == 2
+    speed = Effect.compile("speed_bonus 1.5 20")
+    assert isinstance(speed, SpeedBonus)
+    assert speed.modifier == ("speed", 1.5, "mul")
+    assert speed.duration == 20
+    armor = Effect.compile("ac_bonus 3 10")
+    assert isinstance(armor, AcBonus)
+    assert armor.modifier == ("armor_class", 3, "add")
+
+
+@pytest.mark.parametrize(
+    "text", ["teleport", "heal 4", "heal 4 8 16", "heal four 8", "enchant", "ac_bonus"]
+)
+def test_invalid_definitions(text: str) -> None:
+    with pytest.raises(ValueError):
+        Effect.compile(text)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import mrogue.session
+from mrogue.effects import Effect
+from mrogue.env import Environment
+from mrogue.item.inventory import Inventory, merge_sorted
+from mrogue.item.item import Consumable
+
+
+def potion(name: str, weight: float, value: float, amount: int = 1) -> Consumable:
+    return Consumable(
+        name,
+        weight,
+        value,
+        0x21,
+        amount,
+        (255, 255, 255),
+        Effect.compile("heal 1 4"),
+        name,
+        "potion",
+    )
+
+
+def test_totals_follow_adds_discards_and_amounts(
+    session: mrogue.session.GameSession,
+) -> None:
+    first, second = potion("red", 0.5, 10.0, 2), potion("blue", 0.25, 4.0)
+    inventory = Inventory([first, second])
+    assert inventory.weight == pytest.approx(1.25)
+    assert inventory.value == pytest.approx(24.0)
+    inventory.add(first)
+    assert inventory.weight == pytest.approx(1.25)
+    first.add(inventory)
+    first.amount = 4
+    assert inventory.weight == pytest.approx(2.25)
+    assert inventory.value == pytest.approx(44.0)
+    inventory.discard(first)
+    assert inventory.weight == pytest.approx(0.25)
+    assert inventory.value == pytest.approx(4.0)
+    inventory.discard(first)
+    assert inventory.weight == pytest.approx(0.25)
+
+
+def test_slot_and_stack_indices(session: mrogue.session.GameSession) -> None:
+    first, second = potion("red", 0.5, 10.0), potion("blue", 0.25, 4.0)
+    inventory = Inventory([first, second])
+    assert inventory.in_slot("") == [first, second]
+    assert inventory.in_slot("head") == []
+    assert inventory.stack_for(potion("red", 0.5, 10.0)) is first
+    assert inventory.stack_for(potion("green", 0.5, 10.0)) is None
+    inventory.discard(first)
+    assert inventory.in_slot("") == [second]
+    assert inventory.stack_for(first) is None
+
+
+def test_sorted_views_are_merged(environment: Environment) -> None:
+    # names break ties, and the names of Consumables depend on the player
+    environment.game.session.activate()
+    light, heavy, middle = (
+        potion("a", 0.1, 3.0),
+        potion("b", 2.0, 1.0),
+        potion("c", 1.0, 2.0),
+    )
+    carried, worn = Inventory([heavy, light]), Inventory([middle])
+    assert carried.sorted_by("weight") == [light, heavy]
+    assert merge_sorted("weight", carried, worn) == [light, middle, heavy]
+    assert merge_sorted("value", carried, worn) == [heavy, middle, light]
+    carried.discard(light)
+    assert carried.sorted_by("weight") == [heavy]
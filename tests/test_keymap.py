@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import pytest
+import tcod.event
+
+from mrogue import Point
+from mrogue.keymap import Keymap, modifiers, parse
+
+shift, ctrl = modifiers["shift"], modifiers["ctrl"]
+
+
+def test_parse() -> None:
+    assert parse("i") == (ord("i"), 0)
+    assert parse("shift+.") == (ord("."), shift)
+    assert parse("ctrl+shift+q") == (ord("q"), ctrl | shift)
+    assert parse("kp_5") == (int(tcod.event.KeySym.KP_5), 0)
+    assert parse("Up") == (int(tcod.event.KeySym.UP), 0)
+
+
+@pytest.mark.parametrize("binding", ["nokey", "hyper+i", "shift+"])
+def test_parse_unknown(binding: str) -> None:
+    with pytest.raises(ValueError):
+        parse(binding)
+
+
+def test_default_commands(tmp_path) -> None:
+    keymap = Keymap(str(tmp_path / "missing.ini"))
+    assert keymap.command((ord("i"), 0)) == "inventory"
+    # left and right modifiers are the same, locks are ignored
+    assert keymap.command((ord("q"), int(tcod.event.KMOD_RSHIFT))) == "quit"
+    assert keymap.command((ord("i"), int(tcod.event.KMOD_NUM))) == "inventory"
+    up = int(tcod.event.KeySym.UP)
+    assert keymap.command((up, 0)) == "move"
+    assert keymap.command((up, int(tcod.event.KMOD_LSHIFT))) == "run"
+    assert keymap.step((up, 0), Point(5, 5)) == Point(5, 4)
+    assert keymap.command((ord("z"), 0)) is None
+
+
+def test_rebinding(tmp_path) -> None:
+    config = tmp_path / "keymap.ini"
+    config.write_text(
+        "[commands]\ninventory = tab ctrl+i\nunknown = x\n[directions]\nnorth = w\n"
+    )
+    keymap = Keymap(str(config))
+    assert keymap.command((int(tcod.event.KeySym.TAB), 0)) == "inventory"
+    assert keymap.command((ord("i"), ctrl)) == "inventory"
+    assert keymap.command((ord("i"), 0)) is None
+    assert keymap.command((ord("x"), 0)) is None
+    assert keymap.command((ord("w"), shift)) == "run"
+    assert keymap.step((ord("w"), 0), Point(5, 5)) == Point(5, 4)
+    assert keymap.command((int(tcod.event.KeySym.UP), 0)) is None
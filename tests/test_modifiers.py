@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from mrogue.modifiers import Modifier, Stats
+
+
+def test_set_then_add_then_multiply() -> None:
+    stats = Stats(speed=1.0, armor_class=10)
+    stats.set("boots", Modifier("speed", 2.0, "mul"), Modifier("armor_class", 1))
+    stats.set("curse", Modifier("speed", 0.5, "set"))
+    stats.set("haste", Modifier("speed", 0.25))
+    assert stats["speed"] == pytest.approx(1.5)
+    assert stats["armor_class"] == 11
+
+
+def test_sources_are_replaced_and_cleared() -> None:
+    stats = Stats(armor_class=10)
+    stats.set("shield", Modifier("armor_class", 2))
+    assert stats["armor_class"] == 12
+    stats.set("shield", Modifier("armor_class", 3))
+    assert stats["armor_class"] == 13
+    assert "shield" in stats
+    stats.clear("shield")
+    assert stats["armor_class"] == 10
+    assert "shield" not in stats
+    stats.set("shield")
+    assert "shield" not in stats
+
+
+def test_rebase_keeps_the_modifiers() -> None:
+    stats = Stats(max_HP=10)
+    stats.set("ring", Modifier("max_HP", 2, "mul"))
+    assert stats["max_HP"] == 20
+    stats.rebase("max_HP", 15)
+    assert stats["max_HP"] == 30
+
+
+def test_unknown_operation() -> None:
+    stats = Stats(speed=1.0)
+    with pytest.raises(ValueError):
+        stats.set("spell", Modifier("speed", 2.0, "pow"))
+    assert "spell" not in stats
+    assert stats["speed"] == 1.0
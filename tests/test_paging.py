@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+import mrogue.paging
+from mrogue import Point
+from mrogue.env import Environment, actions
+
+
+def descend(environment: Environment) -> None:
+    session = environment.game.session
+    session.activate()
+    session.player.pos = Point(*session.current_level.stairs_down_pos)
+    environment.step(actions.index("descend"))
+
+
+def page_everything(environment: Environment) -> None:
+    session = environment.game.session
+    session.activate()
+    session.level_store = mrogue.paging.LevelStore(0)
+
+
+def test_player_dies_after_levels_paged_out(environment: Environment) -> None:
+    page_everything(environment)
+    descend(environment)
+    descend(environment)
+    session = environment.game.session
+    session.activate()
+    assert session.depth == 2
+    assert session.levels[0].paged and session.levels[1].paged
+    player = session.player
+    assert player in session.current_level.entities
+    player.kill()
+    assert player not in session.current_level.entities
+
+
+def test_paged_in_level_replays_the_journal(environment: Environment) -> None:
+    page_everything(environment)
+    session = environment.game.session
+    level = session.current_level
+    # a change the regenerated level doesn't have, the journal has to bring it back
+    monster = next(unit for unit in level.entities.units if not unit.player)
+    monster.kill()
+    tiles = level.tiles.copy()
+    explored = level.explored.copy()
+    # the player takes the stairs and isn't there when the level comes back
+    entities = [
+        entity.serial for entity in level.entities if entity is not session.player
+    ]
+    descend(environment)
+    session.activate()
+    assert level.paged and 0 in session.level_store.journals
+    state_hash = session.state_hash()
+    session.level_store.page_in(session, 0)
+    assert not level.paged
+    assert np.array_equal(level.tiles, tiles)
+    assert np.array_equal(level.explored, explored)
+    assert [entity.serial for entity in level.entities] == entities
+    assert monster.serial not in entities
+    # generating the level again leaves the state of the game as it was
+    assert session.state_hash() == state_hash
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+import mrogue.paging
+import mrogue.save
+from mrogue import Point
+from mrogue.env import Environment, actions
+
+
+@pytest.mark.parametrize("paging", [False, True])
+def test_saved_game_loads_the_same(
+    environment: Environment, tmp_path, paging: bool
+) -> None:
+    session = environment.game.session
+    session.activate()
+    if paging:
+        session.level_store = mrogue.paging.LevelStore(0)
+    session.player.pos = Point(*session.current_level.stairs_down_pos)
+    environment.step(actions.index("descend"))
+    file_name = str(tmp_path / "save.dat")
+    mrogue.save.write(file_name, session, turn=environment.game.turn)
+    loaded, extra = mrogue.save.read(file_name, session)
+    assert extra == {"turn": environment.game.turn}
+    assert loaded.state_hash() == session.state_hash()
+    assert loaded.depth == session.depth == 1
+    assert loaded.player.pos == session.player.pos
+    assert loaded.player.current_HP == session.player.current_HP
+    assert loaded.random.getstate() == session.random.getstate()
+    if paging:
+        # saved as generated again from its journal, compared with the same
+        assert session.levels[0].paged
+        session.activate()
+        session.level_store.page_in(session, 0)
+        loaded.activate()
+    for level, original in zip(loaded.levels, session.levels, strict=True):
+        assert np.array_equal(level.tiles, original.tiles)
+        assert np.array_equal(level.explored, original.explored)
+        assert [entity.serial for entity in level.entities] == [
+            entity.serial for entity in original.entities
+        ]
+    assert loaded.current_level is loaded.levels[1]
+    assert loaded.player in loaded.current_level.entities
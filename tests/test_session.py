@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import random
+
+import numpy as np
+
+from mrogue.env import Environment, actions
+
+
+def moves(count: int) -> list[int]:
+    # the same walk in every run, the directions and "wait" only
+    walk = random.Random(1)
+    return [walk.randrange(9) for _ in range(count)]
+
+
+def test_fork_plays_like_the_original(environment: Environment) -> None:
+    before = environment.observe()
+    state_hash = environment.info()["state_hash"]
+    fork = environment.fork()
+    fork_steps = [fork.step(action) for action in moves(30)]
+    # the original is left as it was
+    environment.game.session.activate()
+    assert environment.info()["state_hash"] == state_hash
+    for name, layer in environment.observe().items():
+        assert np.array_equal(layer, before[name])
+    steps = [environment.step(action) for action in moves(30)]
+    for step, fork_step in zip(steps, fork_steps):
+        observation, reward, terminated, _, info = step
+        for name, layer in observation.items():
+            assert np.array_equal(layer, fork_step[0][name])
+        assert (reward, terminated) == fork_step[1:3]
+        assert info == fork_step[4]
+
+
+def test_state_hash_repeats_with_the_game(environment: Environment) -> None:
+    other = Environment(environment.new_game)
+    other.reset(0)
+    other.step(actions.index("wait"))
+    assert other.info()["state_hash"] == environment.info()["state_hash"]
+    for action in moves(30):
+        hashes = environment.step(action)[4]["state_hash"]
+        assert other.step(action)[4]["state_hash"] == hashes
+    other.reset(1)
+    assert other.info()["state_hash"] != environment.info()["state_hash"]
+
+
+def test_state_hash_follows_changes(environment: Environment) -> None:
+    session = environment.game.session
+    session.activate()
+    player = session.player
+    state_hash = session.state_hash()
+    pos = player.pos
+    player.pos = pos._replace(x=pos.x + 1)
+    assert session.state_hash() != state_hash
+    # setting a value back takes its change out of the hash again
+    player.pos = pos
+    assert session.state_hash() == state_hash
+    player.current_HP -= 1
+    assert session.state_hash() != state_hash
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import tcod.console
+import tcod.event
+
+from mrogue.env import Headless
+from mrogue.terminal import decode_keys
+
+
+def test_diff_sends_only_changed_cells() -> None:
+    terminal = Headless()
+    console = tcod.console.Console(8, 2, order="F")
+    console.print(0, 0, "ab", (255, 0, 0), (0, 0, 0))
+    first = terminal.diff(console)
+    # the whole frame first, each row from its first column
+    assert first.startswith("\x1b[1;1H\x1b[38;2;255;0;0;48;2;0;0;0mab")
+    assert "\x1b[2;1H" in first
+    assert terminal.diff(console) == ""
+    # colors are only sent when they differ from those of the cell sent before
+    console.print(7, 1, "z")
+    assert terminal.diff(console) == "\x1b[2;8Hz"
+    console.print(1, 0, "c", (0, 255, 0), (0, 0, 0))
+    assert terminal.diff(console) == "\x1b[1;2H\x1b[38;2;0;255;0mc"
+
+
+def test_diff_splits_distant_changes() -> None:
+    terminal = Headless()
+    console = tcod.console.Console(20, 1, order="F")
+    terminal.diff(console)
+    console.print(0, 0, "a")
+    console.print(2, 0, "b")
+    console.print(15, 0, "c")
+    changed = terminal.diff(console)
+    # the unchanged cell between close changes is resent rather than moved over
+    assert changed.count("\x1b[1;") == 2
+    assert "\x1b[1;1H" in changed and "\x1b[1;16H" in changed
+
+
+def test_diff_redraws_after_resizing() -> None:
+    terminal = Headless()
+    terminal.diff(tcod.console.Console(4, 1, order="F"))
+    assert terminal.diff(tcod.console.Console(5, 1, order="F")).count(" ") == 5
+
+
+def test_decode_keys() -> None:
+    none, shift = tcod.event.KMOD_NONE, tcod.event.KMOD_LSHIFT
+    assert decode_keys("aA>") == [
+        (ord("a"), none),
+        (ord("a"), shift),
+        (ord("."), shift),
+    ]
+    assert decode_keys("\x1b[A\x1bOB\x1b[1;5C\x1b[5~") == [
+        (tcod.event.K_UP, none),
+        (tcod.event.K_DOWN, none),
+        (tcod.event.K_RIGHT, tcod.event.KMOD_LCTRL),
+        (tcod.event.K_PAGEUP, none),
+    ]
+    assert decode_keys("\x1b\r\t\x7f\x11") == [
+        (tcod.event.K_ESCAPE, none),
+        (tcod.event.K_RETURN, none),
+        (tcod.event.K_TAB, none),
+        (tcod.event.K_BACKSPACE, none),
+        (ord("q"), tcod.event.KMOD_LCTRL),
+    ]